@@ -1,17 +1,19 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objs as go
-import boto3
+import aws_clients
 import json
 import uuid  # For generating a unique session ID
 import logging
 import pprint
 from botocore.exceptions import ClientError
-import numpy as np
 from datetime import datetime, timedelta
 import plotly.graph_objects as go  # Importer Plotly
 from data import database
+import price_store
+import fundamentals
+import downsampling
+import prompt_compaction
 
 
 # setting logger
@@ -47,9 +49,8 @@ class BedrockAgentRuntimeWrapper:
             logger.error(f"Couldn't invoke agent. {e}")
             raise
 
-# Initialize Bedrock clients and the wrapper
-bedrock_client = boto3.client('bedrock', region_name='us-west-2')
-bedrock_agent_runtime_client = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
+# Shared Bedrock client (created once per process) and the wrapper
+bedrock_agent_runtime_client = aws_clients.get_client('bedrock-agent-runtime')
 bedrock_wrapper = BedrockAgentRuntimeWrapper(bedrock_agent_runtime_client)
 
 def get_financial_insights(ticker, kpi, median_sector_value, median_other_sectors):
@@ -61,16 +62,16 @@ def get_financial_insights(ticker, kpi, median_sector_value, median_other_sector
     input_text = (
         f"Analyze the financial performance of {ticker} based on the KPI: {kpi}.\n"
         f"And if you can based on your knowledge base.\n"
-        f"Current value for {ticker} is {get_financial_kpi(ticker, kpi):.3f}.\n"
-        f"The median KPI value in its sector is {median_sector_value:.3f}.\n"
-        f"The median KPI values in other sectors are as follows: {median_other_sectors}.\n"
+        f"Current value for {ticker} is {prompt_compaction.format_number(get_financial_kpi(ticker, kpi))}.\n"
+        f"The median KPI value in its sector is {prompt_compaction.format_number(median_sector_value)}.\n"
+        f"The median KPI values in other sectors are as follows: {prompt_compaction.compact_mapping(median_other_sectors)}.\n"
         f"Please provide a concise analysis highlighting the strengths and weaknesses of {ticker} "
         f"compared to the sector median and across different sectors."
         f"Write in French."
     )
 
     # Invoke the agent via the BedrockAgentRuntimeWrapper
-    logger.info(f"Invoking agent with prompt:\n{input_text}")
+    logger.info(f"Invoking agent with prompt (~{prompt_compaction.estimate_tokens(input_text)} tokens):\n{input_text}")
     insights = bedrock_wrapper.invoke_agent(agent_id, agent_alias_id, session_id, input_text)
 
     # Log the response for debugging
@@ -92,37 +93,8 @@ def display_kpis_inline(df, label):
                 st.metric(label=row[0], value=f"{row[1]:.3f}")
 
 def get_financial_kpi(symbol, kpi):
-    kpi_list = [
-        'returnOnAssets', 'returnOnEquity', 'Net Profit Margin',
-        'debtToEquity', 'trailingPE',
-        'ebitda', 'freeCashflow',
-        'trailingEps'
-    ]
-
-    if kpi not in kpi_list:
-        raise ValueError(f"Le KPI '{kpi}' n'est pas pris en charge. Veuillez choisir parmi {kpi_list}.")
-
-    company = yf.Ticker(symbol)
-    info = company.info
-
-    if kpi == 'returnOnAssets':
-        return info.get('returnOnAssets')
-    elif kpi == 'returnOnEquity':
-        return info.get('returnOnEquity')
-    elif kpi == 'Net Profit Margin':
-        return info.get('netProfitMargin')
-    elif kpi == 'debtToEquity':
-        return info.get('debtToEquity')
-    elif kpi == 'trailingPE':
-        return info.get('trailingPE')
-    elif kpi == 'ebitda':
-        return info.get('ebitda')
-    elif kpi == 'freeCashflow':
-        return info.get('freeCashflow')
-    elif kpi == 'trailingEps':
-        return info.get('trailingEps')
-
-    return None
+    # Servi depuis le cache partagé : un seul appel `info` par ticker et par TTL
+    return fundamentals.get_kpi(symbol, kpi)
 
 
 st.title("Analyse fondamentale")
@@ -149,36 +121,46 @@ with col2:
 
 entreprises_meme_secteur = [item for item in database if item['domaine'] == domaine_selectionne]
 
+# Index précalculé (tickers x KPIs, médianes et percentiles par secteur) : chaque comparaison est une simple lecture
+with st.spinner("AlexIA rassemble les indicateurs financiers du marché..."):
+    kpi_index = fundamentals.get_kpi_index()
+
 if entreprises_meme_secteur:
-    data_kpi = []
-    for entreprise in entreprises_meme_secteur:
-        kpi_valeur = get_financial_kpi(entreprise['ticker'], kpi_selectionne)
-        data_kpi.append({'Entreprise': entreprise['nom'], 'Valeur KPI': kpi_valeur})
-    
-    df_kpi = pd.DataFrame(data_kpi)
-    df_kpi_original = df_kpi.copy()
+    df_kpi = pd.DataFrame([
+        {'Entreprise': entreprise['nom'], 'Valeur KPI': kpi_index.value(entreprise['ticker'], kpi_selectionne)}
+        for entreprise in entreprises_meme_secteur
+    ])
     df_kpi = df_kpi[df_kpi['Entreprise'] != entreprise_selectionnee]
 
     col1, col2 = st.columns([3, 1])
 
     with col1:
         if ticker_selectionne:
-            data = yf.Ticker(ticker_selectionne).history(period="1y")
+            price_store.ensure_fresh([ticker_selectionne])
+            periode = st.selectbox("Sélectionnez la période", ["1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"], index=3)
+            data = price_store.load_ohlcv(ticker_selectionne, period=periode)
+
+            # Zoom redécoupé à pleine résolution, puis chaque trace réduite à la largeur du graphique
+            if len(data) > 1:
+                first_day, last_day = data.index.min().date(), data.index.max().date()
+                zoom_start, zoom_end = st.slider("Zoom sur la période", min_value=first_day, max_value=last_day, value=(first_day, last_day), format="DD/MM/YYYY")
+                data = downsampling.zoom(data, zoom_start, zoom_end)
+            series = downsampling.downsample_frame(data[['Open', 'High', 'Low', 'Close']], downsampling.points_for_width(downsampling.FULL_WIDTH * 3 // 4))
 
             # Créer un graphique interactif avec Plotly
             fig = go.Figure()
 
             # Ajouter les traces pour Open, Low, High, Close, Adj Close
-            fig.add_trace(go.Scatter(x=data.index,y=data['Open'], mode='lines', name='Open',line=dict(color='orange')))
-            fig.add_trace(go.Scatter(x=data.index, y=data['High'],mode='lines', name='High',line=dict(color='green')))
-            fig.add_trace(go.Scatter(x=data.index, y=data['Low'], mode='lines',name='Low',line=dict(color='red')))
-            fig.add_trace(go.Scatter(x=data.index, y=data['Close'], mode='lines', name='Close',line=dict(color='blue')))
+            fig.add_trace(go.Scatter(x=series['Open'].index, y=series['Open'], mode='lines', name='Open',line=dict(color='orange')))
+            fig.add_trace(go.Scatter(x=series['High'].index, y=series['High'],mode='lines', name='High',line=dict(color='green')))
+            fig.add_trace(go.Scatter(x=series['Low'].index, y=series['Low'], mode='lines',name='Low',line=dict(color='red')))
+            fig.add_trace(go.Scatter(x=series['Close'].index, y=series['Close'], mode='lines', name='Close',line=dict(color='blue')))
             fig.update_layout(xaxis_title="Date", yaxis_title="Valeur (EUR)", template="plotly_white")
 
             st.plotly_chart(fig, use_container_width=True)        
     with col2:
         st.subheader("")
-        resultat = get_financial_kpi(ticker_selectionne, kpi_selectionne)
+        resultat = kpi_index.value(ticker_selectionne, kpi_selectionne)
         st.markdown(
             f"<div style='text-align: center;'><br><br><h3 style='margin: 0;'>{ticker_selectionne}</h3></div>", 
             unsafe_allow_html=True
@@ -188,7 +170,20 @@ if entreprises_meme_secteur:
             unsafe_allow_html=True
         )
 
-        mediane_secteur = df_kpi_original['Valeur KPI'].median()
+        percentile = kpi_index.sector_percentile(ticker_selectionne, kpi_selectionne)
+        percentile_univers = kpi_index.universe_percentile(ticker_selectionne, kpi_selectionne)
+        lignes = []
+        if pd.notna(percentile):
+            lignes.append(f"Percentile dans le secteur : {percentile * 100:.0f}%")
+        if pd.notna(percentile_univers):
+            lignes.append(f"Percentile dans le marché : {percentile_univers * 100:.0f}%")
+        if lignes:
+            st.markdown(
+                f"<div style='text-align: center;'>{'<br>'.join(lignes)}<br><br></div>",
+                unsafe_allow_html=True
+            )
+
+        mediane_secteur = kpi_index.sector_median(domaine_selectionne, kpi_selectionne)
         st.markdown(
             f"<div style='text-align: center;'><h3 style='margin: 0;'>{domaine_selectionne} (médiane)</h3></div>", 
             unsafe_allow_html=True
@@ -204,22 +199,12 @@ if entreprises_meme_secteur:
     else:
         st.write("Aucune donnée à afficher pour les entreprises dans le même secteur.")
 
-    secteurs_distincts = set(item['domaine'] for item in database if item['domaine'] != domaine_selectionne)
-    medianes_par_secteur = []
-    for secteur in secteurs_distincts:
-        entreprises_autre_secteur = [item for item in database if item['domaine'] == secteur]
-        data_kpi_secteur = []
-        
-        for entreprise in entreprises_autre_secteur:
-            kpi_valeur = get_financial_kpi(entreprise['ticker'], kpi_selectionne)
-            if kpi_valeur is not None:
-                data_kpi_secteur.append(kpi_valeur)
-        
-        if len(data_kpi_secteur) > 0:
-            mediane_secteur = np.median(data_kpi_secteur, axis=0)
-            medianes_par_secteur.append({'Secteur': secteur, 'Valeur mediane du KPI': mediane_secteur})
-    
-    df_medianes_secteurs = pd.DataFrame(medianes_par_secteur)
+    df_medianes_secteurs = (
+        kpi_index.other_sector_medians(domaine_selectionne, kpi_selectionne)
+        .rename('Valeur mediane du KPI')
+        .rename_axis('Secteur')
+        .reset_index()
+    )
     if not df_medianes_secteurs.empty:
         display_kpis_inline(df_medianes_secteurs, f"{kpi_selectionne} médian pour les autres secteurs")
     else:
@@ -229,7 +214,7 @@ if entreprises_meme_secteur:
 st.subheader("Insights Financiers")
 with st.spinner("AlexIA réfléchit profondément..."):
     try:
-        financial_insights = get_financial_insights(ticker_selectionne, kpi_selectionne, mediane_secteur, df_medianes_secteurs)
+        financial_insights = get_financial_insights(ticker_selectionne, kpi_selectionne, mediane_secteur, df_medianes_secteurs.set_index('Secteur')['Valeur mediane du KPI'])
         st.write(financial_insights)
     except Exception as e:
         st.error("Erreur lors de l'obtention de l'analyse.")
@@ -1,6 +1,5 @@
 import streamlit as st
-import stats_can
-import pandas as pd
+import macro_store
 import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
@@ -12,17 +11,9 @@ st.title("Analyse économique (Canada)")
 st.markdown("""**Suivez avec Alexia les tendances des principaux indicateurs économiques pour une idée globale du marché canadien de 2014 à aujourd’hui.**""")
 
 
-# Function to load and filter data with optional annual variation calculation
-def load_indicator_data(table_id, filters, calculate_variation=False):
-    df = stats_can.table_to_df(table_id)
-    for column, value in filters.items():
-        df = df[df[column] == value]
-    df = df[(df['REF_DATE'] >= '2014-01-01') & (df['GEO'] == 'Canada')]
-    df['REF_DATE'] = pd.to_datetime(df['REF_DATE'])
-    df.set_index('REF_DATE', inplace=True)
-
-    # Convert VALUE to numeric, forcing errors to NaN
-    df['VALUE'] = pd.to_numeric(df['VALUE'], errors='coerce')
+# Function to load filtered data from the local Stats Canada store with optional annual variation calculation
+def load_indicator_data(name, calculate_variation=False):
+    df = macro_store.load_series(name).set_index('REF_DATE')
 
     if calculate_variation:
         df_annual = df['VALUE'].resample('Y').mean()
@@ -35,34 +26,11 @@ def load_indicator_data(table_id, filters, calculate_variation=False):
         df_resampled.columns = ['Year', 'VALUE']
         return df_resampled[['Year', 'VALUE']]
 
-# Load data for each indicator
-consumer_spending_data = load_indicator_data(
-    '36-10-0101-01',
-    filters={'Quintile': 'All quintiles', 'Socio-demographic characteristics': 'All households'},
-    calculate_variation=True
-)
-
-interest_rate_data = load_indicator_data(
-    '10-10-0122-01',
-    filters={'Rates': 'Bank rate'},
-    calculate_variation=True
-)
-
-gdp_data = load_indicator_data(
-    '36-10-0104-01',
-    filters={
-        'Prices': 'Chained (2017) dollars percentage change',
-        'Seasonal adjustment': 'Seasonally adjusted at annual rates',
-        'Estimates': 'Gross domestic product at market prices'
-    },
-    calculate_variation=False
-)
-
-inflation_data = load_indicator_data(
-    '18-10-0004-01',
-    filters={'Products and product groups': 'All-items'},
-    calculate_variation=True
-)
+# Load data for each indicator (filters are defined in macro_store.INDICATORS)
+consumer_spending_data = load_indicator_data('consumer_spending', calculate_variation=True)
+interest_rate_data = load_indicator_data('interest_rate', calculate_variation=True)
+gdp_data = load_indicator_data('gdp', calculate_variation=False)
+inflation_data = load_indicator_data('inflation', calculate_variation=True)
 
 # Rename columns for merging
 consumer_spending_data.rename(columns={'Annual Variation (%)': 'Consumer Spending Annual Variation (%)'}, inplace=True)
@@ -0,0 +1,42 @@
+import streamlit as st
+import price_store
+import screener
+from data import database
+
+
+st.title("Screener technique")
+st.markdown("Alexia passe au crible toutes les entreprises suivies et classe les signaux techniques (RSI, croisements MACD, tendance OBV, bandes de Bollinger) du plus haussier au plus baissier.")
+
+with st.spinner("AlexIA analyse l'ensemble du marché..."):
+    price_store.ensure_fresh()
+    signaux = screener.screen()
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    secteurs = sorted(set(item['domaine'] for item in database))
+    secteurs_choisis = st.multiselect("Secteurs", secteurs, default=secteurs)
+with col2:
+    rsi_choisis = st.multiselect("Signal RSI", ['Survendu', 'Neutre', 'Suracheté'], default=['Survendu', 'Neutre', 'Suracheté'])
+with col3:
+    croisements = st.multiselect("Croisement MACD récent", ['Haussier', 'Baissier'])
+with col4:
+    score_min = st.slider("Score minimal", min_value=-4, max_value=4, value=-4)
+
+filtre = (
+    signaux['Secteur'].isin(secteurs_choisis)
+    & signaux['Signal RSI'].isin(rsi_choisis)
+    & (signaux['Score'] >= score_min)
+)
+if croisements:
+    filtre &= signaux['Croisement MACD'].isin(croisements)
+
+st.dataframe(
+    signaux[filtre],
+    use_container_width=True,
+    column_config={
+        'RSI': st.column_config.NumberColumn(format="%.1f"),
+        'MACD': st.column_config.NumberColumn("MACD - signal", format="%.3f"),
+        '%B Bollinger': st.column_config.NumberColumn(format="%.2f"),
+    },
+)
+st.caption(f"{filtre.sum()} entreprise(s) sur {len(signaux)} correspondent aux filtres. Les croisements MACD portent sur les {screener.CROSS_LOOKBACK} dernières séances.")
@@ -1,15 +1,16 @@
 import pandas as pd
-import numpy as np
-import yfinance as yf
 import plotly.graph_objects as go
 import streamlit as st
-import boto3
+import aws_clients
 import json
 import logging
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 import uuid
 from data import database
+import price_store
+import indicators
+import downsampling
 
 # Extraire les domaines et les entreprises correspondantes
 sectors_from_db = {domaine: [entry['ticker'] for entry in database if entry['domaine'] == domaine] for domaine in set(entry['domaine'] for entry in database)}
@@ -48,9 +49,8 @@ class BedrockAgentRuntimeWrapper:
             logger.error(f"Couldn't invoke agent. {e}")
             raise
 
-# Initialize Bedrock clients and the wrapper
-bedrock_client = boto3.client('bedrock', region_name='us-west-2')
-bedrock_agent_runtime_client = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
+# Shared Bedrock client (created once per process) and the wrapper
+bedrock_agent_runtime_client = aws_clients.get_client('bedrock-agent-runtime')
 bedrock_wrapper = BedrockAgentRuntimeWrapper(bedrock_agent_runtime_client)
 
 def get_financial_insights(tickers_list):
@@ -76,33 +76,6 @@ def get_financial_insights(tickers_list):
     
     return insights or 'No insights available.'
 
-def calculate_rsi(data, window=14):
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_macd(data, short_window=12, long_window=26, signal_window=9):
-    short_ema = data['Close'].ewm(span=short_window, adjust=False).mean()
-    long_ema = data['Close'].ewm(span=long_window, adjust=False).mean()
-    macd = short_ema - long_ema
-    signal_line = macd.ewm(span=signal_window, adjust=False).mean()
-    return macd, signal_line
-
-def calculate_obv(data):
-    obv = (np.sign(data['Close'].diff()) * data['Volume']).fillna(0).cumsum()
-    return obv
-
-def calculate_bollinger_bands(data, window=20):
-    rolling_mean = data['Close'].rolling(window=window).mean()
-    rolling_std = data['Close'].rolling(window=window).std()
-    upper_band = rolling_mean + (2 * rolling_std)
-    lower_band = rolling_mean - (2 * rolling_std)
-    return rolling_mean, upper_band, lower_band
-
-
 st.title('Analyse Technique')
 st.markdown("Alexia vous aide à suivre les tendances des principaux KPIs techniques par secteur ou entreprise, pour une évaluation approfondie de la performance.")
 
@@ -145,39 +118,59 @@ with col1:
         st.warning("Veuillez sélectionner au moins une entreprise.")
         st.stop()
     
-end_date = pd.to_datetime('today')
-start_date = end_date - pd.DateOffset(
-    months=int(periode[:-1]) * 12 if 'y' in periode else int(periode[:-2]) if 'mo' in periode else 0
-)
-
 with col2:
     chart_type = st.selectbox('Sélectionnez le type de graphique à afficher :', ['RSI', 'MACD', 'OBV'])
 
-kpi_values = []
+# Indicateurs nécessaires pour chaque graphique et pour le prompt de l'agent
+CHART_INDICATORS = {'RSI': ['RSI'], 'MACD': ['MACD', 'Signal_Line'], 'OBV': ['OBV']}
+KPI_INDICATORS = ['RSI', 'MACD', 'OBV']
+
+price_store.ensure_fresh(tickers)
+
+# Panneau large (dates x tickers) évalué paresseusement : seul le graphique actif est calculé.
+# Il est conservé entre les ré-exécutions, donc changer de graphique réutilise les intermédiaires.
+close = price_store.load_prices(tickers, period=periode, field='Close')
+panel_key = (tuple(tickers), periode, close.index.max())
+if st.session_state.get('indicator_panel_key') != panel_key:
+    st.session_state['indicator_panel'] = indicators.IndicatorPanel(
+        close, lambda: price_store.load_prices(tickers, period=periode, field='Volume')
+    )
+    st.session_state['indicator_panel_key'] = panel_key
+panel = st.session_state['indicator_panel']
+chart = panel.compute(CHART_INDICATORS[chart_type])
+
+# Zoom : la plage choisie est redécoupée dans les séries complètes, puis ré-échantillonnée
+# à la largeur d'un graphique de la grille (un zoom étroit affiche donc tous les points)
+if close.empty:
+    st.error('Aucune donnée trouvée pour les entreprises sélectionnées.')
+    st.stop()
+first_day, last_day = close.index.min().date(), close.index.max().date()
+if first_day < last_day:
+    zoom_start, zoom_end = st.slider("Zoom sur la période", min_value=first_day, max_value=last_day, value=(first_day, last_day), format="DD/MM/YYYY")
+else:
+    zoom_start, zoom_end = first_day, last_day
 
 for i, ticker in enumerate(tickers):
-    data = yf.download(ticker, start=start_date, end=end_date)
+    traded = close[ticker].notna()
+    data = pd.DataFrame({name: values[ticker] for name, values in chart.items()})[traded]
+    data = downsampling.zoom(data, zoom_start, zoom_end)
 
     if not data.empty:
-        data['RSI'] = calculate_rsi(data)
-        data['MACD'], data['Signal_Line'] = calculate_macd(data)
-        data['OBV'] = calculate_obv(data)
-        data['Rolling Mean'], data['Upper Band'], data['Lower Band'] = calculate_bollinger_bands(data)
-
+        series = downsampling.downsample_frame(data, downsampling.points_for_width(downsampling.HALF_WIDTH))
         fig = go.Figure()
         if chart_type == 'RSI':
-            fig.add_trace(go.Scatter(x=data.index, y=data['RSI'], mode='lines', name='RSI', line=dict(color='blue')))
+            fig.add_trace(go.Scatter(x=series['RSI'].index, y=series['RSI'], mode='lines', name='RSI', line=dict(color='blue')))
             fig.add_hline(y=30, line=dict(color='red', dash='dash'), annotation_text='Survendu', annotation_position='bottom right')
             fig.add_hline(y=70, line=dict(color='green', dash='dash'), annotation_text='Suracheté', annotation_position='top right')
             fig.update_layout(title=f'RSI pour {ticker}', xaxis_title='Date', yaxis_title='RSI')
 
         elif chart_type == 'MACD':
-            fig.add_trace(go.Scatter(x=data.index, y=data['MACD'], mode='lines', name='MACD', line=dict(color='blue')))
-            fig.add_trace(go.Scatter(x=data.index, y=data['Signal_Line'], mode='lines', name='Signal Line', line=dict(color='orange')))
+            fig.add_trace(go.Scatter(x=series['MACD'].index, y=series['MACD'], mode='lines', name='MACD', line=dict(color='blue')))
+            fig.add_trace(go.Scatter(x=series['Signal_Line'].index, y=series['Signal_Line'], mode='lines', name='Signal Line', line=dict(color='orange')))
             fig.update_layout(title=f'MACD pour {ticker}', xaxis_title='Date', yaxis_title='MACD')
 
         elif chart_type == 'OBV':
-            fig.add_trace(go.Scatter(x=data.index, y=data['OBV'], mode='lines', name='OBV', line=dict(color='purple')))
+            fig.add_trace(go.Scatter(x=series['OBV'].index, y=series['OBV'], mode='lines', name='OBV', line=dict(color='purple')))
             fig.update_layout(title=f'OBV pour {ticker}', xaxis_title='Date', yaxis_title='OBV')
 
         # Arrange graphs in two columns
@@ -189,15 +182,6 @@ for i, ticker in enumerate(tickers):
             with col2:
                 st.plotly_chart(fig, use_container_width=True)
 
-        # Collect KPI values for the agent
-        kpi_values.append({
-            "ticker": ticker,
-            "RSI": data['RSI'].iloc[-1],
-            "MACD": data['MACD'].iloc[-1],
-            "OBV": data['OBV'].iloc[-1],
-            # Add more KPIs if needed
-        })
-
     else:
         st.error(f'Aucune donnée trouvée pour {ticker}.')
 
@@ -205,6 +189,14 @@ for i, ticker in enumerate(tickers):
 if st.button("Analyser"):
     try:
         with st.spinner("AlexIA est en pleine analyse..."):
+            # Dernière ligne valide du panneau déjà construit : mêmes valeurs que les graphiques (période choisie)
+            kpis = panel.compute(KPI_INDICATORS)
+            kpi_values = []
+            for ticker in tickers:
+                last_date = close[ticker].last_valid_index()
+                if last_date is not None:
+                    kpi_values.append({"ticker": ticker, **{name: kpis[name].at[last_date, ticker] for name in KPI_INDICATORS}})
+
             # Prepare the prompt
             insights = get_financial_insights(kpi_values)
             st.subheader("Insights sur les actions sélectionnées :")
@@ -1,4 +1,12 @@
 import streamlit as st 
+import recorder
+import scheduler
+
+# Enregistrement / rejeu des appels externes (sans effet si ALEXIA_REPLAY_MODE n'est pas défini)
+recorder.install()
+
+# Rafraîchissement des données en arrière-plan (démarré une seule fois par processus)
+refresh_scheduler = scheduler.start()
 
 # Configurer la page pour un affichage large
 st.set_page_config(page_title="AlexIA", page_icon="alexia2.png", layout="wide")
@@ -10,6 +18,7 @@ pages = {
         st.Page("analyse_glob.py", title="Analyse économique (Canada)"),
         st.Page("analyse_fond.py", title="Analyse fondamentale"),
         st.Page("analyse_tech.py", title="Analyse technique"),
+        st.Page("analyse_screener.py", title="Screener technique"),
         st.Page("sentiment.py", title="Analyse de Sentiments")
     ],
     "Gouvernance": [st.Page("board.py", title="Tableau de bord de gouvernance")],
@@ -42,5 +51,19 @@ st.sidebar.markdown(
 st.sidebar.markdown("\n\n")
 st.sidebar.markdown("\n\n")
 
+# État du dernier rafraîchissement de chaque jeu de données
+if refresh_scheduler is not None:
+    with st.sidebar.expander("État des données"):
+        for state in refresh_scheduler.status().values():
+            if state['running']:
+                st.caption(f"{state['label']} : rafraîchissement en cours...")
+            elif state['last_refresh'] is None:
+                st.caption(f"{state['label']} : en attente")
+            else:
+                message = f"{state['label']} : {state['last_refresh']:%d/%m %H:%M}"
+                if state['error'] or state['failures']:
+                    message += f" ({len(state['failures']) or 1} erreur(s))"
+                st.caption(message)
+
 # Lancer la navigation
 pg.run()
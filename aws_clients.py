@@ -0,0 +1,43 @@
+"""Clients AWS partagés par toutes les pages et sessions.
+
+Les pages Streamlit sont ré-exécutées à chaque interaction : créer un client boto3 au
+niveau du module refaisait à chaque clic la résolution des identifiants et la mise en
+place des connexions TLS. Ici chaque client est créé au premier usage puis réutilisé
+(les clients boto3 sont thread-safe, la création ne l'est pas et se fait sous verrou).
+"""
+import threading
+
+import boto3
+from botocore.config import Config
+
+REGION_NAME = 'us-west-2'
+
+# Taille du pool de connexions HTTP de chaque client (partagé par toutes les sessions)
+CLIENT_CONFIG = Config(max_pool_connections=32, retries={'max_attempts': 3, 'mode': 'standard'})
+
+_session = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name, region_name=REGION_NAME):
+    """Renvoie le client partagé d'un service AWS, créé au premier appel."""
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    global _session
+    with _lock:
+        if key not in _clients:
+            if _session is None:
+                _session = boto3.session.Session()
+            _clients[key] = _session.client(service_name, region_name=region_name, config=CLIENT_CONFIG)
+        return _clients[key]
+
+
+def reset():
+    """Oublie les clients existants (ex. après un changement d'identifiants)."""
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
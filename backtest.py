@@ -0,0 +1,158 @@
+"""Backtest glissant des allocations du pricer.
+
+À chaque date de rééquilibrage, la moyenne et la covariance des rendements sont
+estimées sur la fenêtre précédente, puis les poids du profil sont recalculés avec les
+mêmes solveurs que le pricer et conservés jusqu'au rééquilibrage suivant (les poids
+dérivent avec les prix entre deux dates).
+
+Les estimations de toutes les dates sont obtenues d'un coup à partir de sommes
+cumulées des rendements et de leurs produits extérieurs : la fenêtre [t - L, t) est la
+différence de deux sommes cumulées. Les profils sont évalués en parallèle sur le pool
+de calcul partagé (`compute_pool`).
+"""
+import numpy as np
+import pandas as pd
+
+import compute_pool
+import portfolio
+
+TRADING_DAYS = 252
+LOOKBACK = 252
+REBALANCE_FREQUENCIES = {"Mensuel": 21, "Trimestriel": 63, "Semestriel": 126, "Annuel": 252}
+
+# Profils du pricer -> stratégie (Risque et Optimal utilisent le même solveur)
+PROFILES = {
+    'Prudent': 'min_variance',
+    'Risque': 'max_sharpe',
+    'Optimal': 'max_sharpe',
+}
+BENCHMARK = 'Équipondéré'
+# Colonnes du tableau des métriques exprimées en pourcentage (les autres sont des comptes)
+PERCENT_COLUMNS = ['Rendement annualisé (%)', 'Volatilité annualisée (%)', 'Perte maximale (%)', 'Rotation annuelle (%)']
+
+
+def window_moments(returns, lookback=LOOKBACK, dates=None):
+    """Moyennes et covariances annualisées des fenêtres de `lookback` jours précédant chaque date.
+
+    `returns` : tableau (jours x actifs) avec NaN pour les jours sans cotation ; `dates` :
+    positions des fins de fenêtre (exclues). Renvoie (moyennes, covariances, actifs complets),
+    de formes (dates x actifs), (dates x actifs x actifs) et (dates x actifs).
+    """
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    zero = np.zeros((1,) + x.shape[1:])
+    csum = np.concatenate([zero, np.cumsum(x, axis=0)])
+    count = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    outer = np.concatenate([np.zeros((1, x.shape[1], x.shape[1])), np.cumsum(x[:, :, None] * x[:, None, :], axis=0)])
+
+    dates = np.asarray(dates)
+    total = csum[dates] - csum[dates - lookback]
+    total_outer = outer[dates] - outer[dates - lookback]
+    # Seuls les actifs cotés sur toute la fenêtre sont investissables à cette date
+    complete = (count[dates] - count[dates - lookback]) == lookback
+
+    mean = total / lookback
+    cov = (total_outer - lookback * mean[:, :, None] * mean[:, None, :]) / (lookback - 1)
+    return mean * TRADING_DAYS, cov * TRADING_DAYS, complete
+
+
+def _target_weights(strategy, mean, cov, constraints_kwargs):
+    """Poids cibles d'une stratégie ; renvoie (poids, contraintes relâchées, repli équipondéré)."""
+    equal = np.full(len(mean), 1.0 / len(mean))
+    if strategy == BENCHMARK:
+        return equal, False, False
+    relaxed = False
+    try:
+        constraints = portfolio.Constraints(len(mean), **constraints_kwargs)
+    except ValueError:
+        # Trop peu d'actifs investissables pour respecter les plafonds : on les relâche
+        constraints = portfolio.Constraints(len(mean))
+        relaxed = True
+    solver = portfolio.min_variance if strategy == 'min_variance' else portfolio.max_sharpe
+    try:
+        return solver(mean, cov, constraints).weights, relaxed, False
+    except ValueError:
+        # Ex. aucun rendement attendu positif pour le Sharpe maximal : compté dans les métriques
+        return equal, relaxed, True
+
+
+def run_strategy(strategy, returns, rebalance_dates, means, covs, complete, sectors=None,
+                 max_weight=1.0, max_sector_weight=1.0):
+    """Valeur quotidienne (base 1), rotation à chaque rééquilibrage et nombre de rééquilibrages
+    aux contraintes relâchées ou en repli équipondéré, d'une stratégie."""
+    num_days, num_assets = returns.shape
+    growth = np.cumprod(1.0 + np.nan_to_num(returns), axis=0)
+    values = np.ones(num_days - rebalance_dates[0] + 1)
+    turnover = np.zeros(len(rebalance_dates))
+    drifted = np.zeros(num_assets)
+    value = 1.0
+    relaxed_count = fallback_count = 0
+    ends = list(rebalance_dates[1:]) + [num_days]
+
+    for k, (start, end) in enumerate(zip(rebalance_dates, ends)):
+        target = np.zeros(num_assets)
+        assets = np.flatnonzero(complete[k])
+        if len(assets):
+            kwargs = {'max_weight': max_weight, 'max_sector_weight': max_sector_weight}
+            if sectors is not None:
+                kwargs['sectors'] = [sectors[i] for i in assets]
+            target[assets], relaxed, fallback = _target_weights(
+                strategy, means[k, assets], covs[k][np.ix_(assets, assets)], kwargs
+            )
+            relaxed_count += relaxed
+            fallback_count += fallback
+        turnover[k] = np.abs(target - drifted).sum() / 2 if k else 0.0
+
+        # Entre deux rééquilibrages, chaque position évolue avec son prix (achat-conservation)
+        base = growth[start - 1] if start > 0 else np.ones(num_assets)
+        segment = (growth[start:end] / base) @ target if target.any() else np.ones(end - start)
+        values[start - rebalance_dates[0] + 1:end - rebalance_dates[0] + 1] = value * segment
+        positions = target * (growth[end - 1] / base)
+        drifted = positions / positions.sum() if positions.sum() > 0 else np.zeros(num_assets)
+        value *= segment[-1]
+    return values, turnover, relaxed_count, fallback_count
+
+
+def metrics(values, turnover, relaxed, fallbacks, years):
+    """Rendement annualisé, volatilité annualisée, perte maximale, rotation annuelle, et nombre
+    de rééquilibrages aux contraintes relâchées ou en repli équipondéré (échec du solveur)."""
+    daily = values[1:] / values[:-1] - 1
+    drawdown = values / np.maximum.accumulate(values) - 1
+    return {
+        'Rendement annualisé (%)': (values[-1] ** (1 / years) - 1) * 100,
+        'Volatilité annualisée (%)': daily.std(ddof=1) * np.sqrt(TRADING_DAYS) * 100,
+        'Perte maximale (%)': drawdown.min() * 100,
+        'Rotation annuelle (%)': turnover.sum() / years * 100,
+        'Contraintes relâchées': relaxed,
+        'Replis équipondérés': fallbacks,
+    }
+
+
+def backtest(prices, rebalance_every=21, lookback=LOOKBACK, profiles=PROFILES, sectors=None,
+             max_weight=1.0, max_sector_weight=1.0, parallel=True):
+    """Backtest des profils sur un tableau large de prix ajustés (dates x tickers).
+
+    Renvoie (DataFrame des valeurs quotidiennes base 100 par profil, DataFrame des métriques).
+    """
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    data = returns.to_numpy(dtype=float)
+    if len(data) <= lookback:
+        raise ValueError(f"Historique trop court : {len(data)} rendements pour une fenêtre de {lookback} jours.")
+    rebalance_dates = np.arange(lookback, len(data), rebalance_every)
+    means, covs, complete = window_moments(data, lookback, rebalance_dates)
+
+    strategies = list(dict.fromkeys(list(profiles.values()) + [BENCHMARK]))
+    args = (data, rebalance_dates, means, covs, complete, sectors, max_weight, max_sector_weight)
+    if parallel:
+        results = compute_pool.run_many(run_strategy, strategies, *([a] * len(strategies) for a in args))
+    else:
+        results = [run_strategy(strategy, *args) for strategy in strategies]
+    results = dict(zip(strategies, results))
+
+    index = returns.index[lookback - 1:]
+    years = (len(index) - 1) / TRADING_DAYS
+    names = list(profiles) + [BENCHMARK]
+    sources = {**profiles, BENCHMARK: BENCHMARK}
+    values = pd.DataFrame({name: results[sources[name]][0] * 100 for name in names}, index=index)
+    table = pd.DataFrame({name: metrics(*results[sources[name]], years) for name in names}).T
+    return values, table
@@ -0,0 +1,70 @@
+"""Mesure la taille du JSON Plotly envoyé au navigateur, avant et après sous-échantillonnage LTTB.
+
+Usage : python bench_downsampling.py [--store]
+Par défaut les séries sont synthétiques (marche aléatoire de prix journaliers) ; avec --store,
+les graphiques sont construits à partir du stockage local des prix (`price_store`).
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import downsampling
+
+PERIODS = {"1y": 252, "5y": 5 * 252, "10y": 10 * 252, "max": 30 * 252}
+SECTORS = 8
+
+
+def synthetic_frame(days, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    returns = rng.normal(0.0003, 0.015, size=(days, len(columns)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates, columns=columns)
+
+
+def store_frame(days, columns):
+    import price_store
+    tickers = price_store.universe_tickers()[:len(columns)]
+    prices = price_store.load_prices(tickers, period="max").iloc[-days:]
+    return prices.set_axis(columns[:prices.shape[1]], axis=1)
+
+
+def figure(traces):
+    fig = go.Figure()
+    for name, series in traces.items():
+        fig.add_trace(go.Scatter(x=series.index, y=series, mode='lines', name=name))
+    return fig
+
+
+def measure(frame, width):
+    started = time.perf_counter()
+    full = figure({column: frame[column].dropna() for column in frame.columns}).to_json()
+    full_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reduced = figure(downsampling.downsample_frame(frame, downsampling.points_for_width(width))).to_json()
+    reduced_time = time.perf_counter() - started
+    return len(full), full_time, len(reduced), reduced_time
+
+
+def main():
+    load = store_frame if "--store" in sys.argv else synthetic_frame
+    charts = {
+        "Analyse technique (MACD, 2 traces)": (['MACD', 'Signal_Line'], downsampling.HALF_WIDTH),
+        "Analyse fondamentale (OHLC, 4 traces)": (['Open', 'High', 'Low', 'Close'], downsampling.FULL_WIDTH * 3 // 4),
+        f"Accueil ({SECTORS} secteurs)": ([f"Secteur {i}" for i in range(SECTORS)], downsampling.FULL_WIDTH),
+    }
+    print(f"{'Graphique':40} {'Période':>7} {'Avant (ko)':>11} {'Après (ko)':>11} {'Ratio':>6} {'Avant (ms)':>11} {'Après (ms)':>11}")
+    for label, (columns, width) in charts.items():
+        for period, days in PERIODS.items():
+            full_size, full_time, reduced_size, reduced_time = measure(load(days, columns), width)
+            print(
+                f"{label:40} {period:>7} {full_size / 1024:>11.1f} {reduced_size / 1024:>11.1f} "
+                f"{full_size / reduced_size:>6.1f} {full_time * 1000:>11.1f} {reduced_time * 1000:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
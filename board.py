@@ -1,17 +1,14 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
 import plotly.graph_objs as go
-import boto3
+import aws_clients
 import json
 import uuid  # For generating a unique session ID
 import logging
 import pprint
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
-import requests
-from bs4 import BeautifulSoup
 from data import database
+import governance
 
 
 # setting logger
@@ -47,9 +44,8 @@ class BedrockAgentRuntimeWrapper:
             logger.error(f"Couldn't invoke agent. {e}")
             raise
 
-# Initialize Bedrock clients and the wrapper
-bedrock_client = boto3.client('bedrock', region_name='us-west-2')
-bedrock_agent_runtime_client = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
+# Shared Bedrock client (created once per process) and the wrapper
+bedrock_agent_runtime_client = aws_clients.get_client('bedrock-agent-runtime')
 bedrock_wrapper = BedrockAgentRuntimeWrapper(bedrock_agent_runtime_client)
 
 def get_financial_insights(ticker):
@@ -57,32 +53,17 @@ def get_financial_insights(ticker):
     agent_id = 'ACVSW7ULXC'
     agent_alias_id = 'FGVZUPEISZ'
     
-    # Prepare company data from yfinance
+    # Instantané partagé avec le tableau des dirigeants et la jauge de risque
+    snapshot = governance.get_snapshot(ticker)
     company_data = []
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    
     company_details = {
         "ticker": ticker,
-        "industry": info.get("industry"),
-        "business_summary": info.get("longBusinessSummary"),
-        "full_time_employees": info.get("fullTimeEmployees"),
-        "company_officers": [
-            {
-                "name": officer.get("name"),
-                "age": officer.get("age"),
-                "title": officer.get("title"),
-                "total_pay": officer.get("totalPay")
-            }
-            for officer in info.get("companyOfficers", []) if officer
-        ],
-        "audit_risk": info.get("auditRisk"),
-        "board_risk": info.get("boardRisk"),
-        "compensation_risk": info.get("compensationRisk"),
-        "shareholder_rights_risk": info.get("shareHolderRightsRisk"),
-        "overall_risk": info.get("overallRisk"),
-        "held_percent_insiders": info.get("heldPercentInsiders"),
-        "held_percent_institutions": info.get("heldPercentInstitutions"),
+        "industry": snapshot.industry,
+        "business_summary": snapshot.business_summary,
+        "full_time_employees": snapshot.full_time_employees,
+        "company_officers": snapshot.officers,
+        **snapshot.risks,
+        **snapshot.ownership,
     }
     company_data.append(company_details)
     
@@ -122,56 +103,12 @@ def get_financial_insights(ticker):
     return insights or 'No insights available.'
 
 def get_board_risk(ticker):
-    stock = yf.Ticker(ticker)
-    board_risk = stock.info.get('boardRisk', 'Non disponible')
-    return board_risk
-
+    return governance.get_snapshot(ticker).board_risk
 
 
-def get_age_from_web(name, company):
-    search_query = f"{name} {company} age"
-    url = f"https://www.google.com/search?q={search_query}"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Cette partie est très basique et peut nécessiter des ajustements
-    age_text = soup.find(text=lambda t: t and 'age' in t.lower())
-    if age_text:
-        age = ''.join(filter(str.isdigit, age_text))
-        return age if age else "Non trouvé"
-    return "Non trouvé"
-
 def get_executive_info(ticker):
-    stock = yf.Ticker(ticker)
-    company_name = stock.info.get('longName', '')
-    executives = stock.info.get('companyOfficers', [])
-    board_risk = get_board_risk(ticker)
-    
-    data = []
-    for exec in executives:
-        name = exec.get('name', '')
-        age = exec.get('age', '')
-        title = exec.get('title', '')
-        
-        # Récupération des revenus (modifié ici)
-        compensation = exec.get('totalPay', 'Non disponible')
-
-        if not age:
-            age = get_age_from_web(name, company_name)
-        
-        data.append({
-            'Nom': name,
-            'Âge': age,
-            'Position': title,
-            'Paye annuelle': compensation
-        })
-    
-    return pd.DataFrame(data), board_risk
+    snapshot = governance.get_snapshot(ticker)
+    return snapshot.executives_frame(), snapshot.board_risk
 
 st.title("Tableau de bord de gouvernance")
 st.markdown("""Explorez avec Alexia les caractéristiques du board afin de prévoir les futures décisions.""")
@@ -0,0 +1,139 @@
+"""Pool de processus partagé pour les calculs lourds des pages (simulation, optimisation, screener).
+
+Streamlit exécute le script de chaque session dans un thread d'un même processus : un
+calcul NumPy/SciPy long y retient le GIL et ralentit les pages des autres utilisateurs.
+Les tâches sont donc envoyées à un pool unique et borné de processus, partagé par toutes
+les sessions.
+
+Les tâches sont rattachées à la session Streamlit qui les a soumises. Pendant l'attente
+des résultats (`gather`), une demande de ré-exécution ou d'arrêt de la session annule ses
+tâches encore en file et interrompt le script comme le ferait Streamlit. Une tâche déjà
+démarrée va à son terme : découper le travail en blocs rend l'annulation plus fine.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from streamlit.runtime.scriptrunner import RerunException, StopException, get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.environ.get("ALEXIA_COMPUTE_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+# Intervalle de vérification des demandes de ré-exécution pendant l'attente des résultats
+POLL_SECONDS = 0.1
+
+_pool = None
+_lock = threading.Lock()
+_session_futures = {}  # session_id -> ensemble des Future en cours
+
+
+def get_pool():
+    """Pool partagé, créé au premier besoin (processus lancés par 'spawn', sûr avec les threads de Streamlit)."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _session_id():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def _forget(session_id, future):
+    with _lock:
+        futures = _session_futures.get(session_id)
+        if futures is not None:
+            futures.discard(future)
+            if not futures:
+                del _session_futures[session_id]
+
+
+def submit(func, *args):
+    """Soumet `func(*args)` au pool ; la tâche est rattachée à la session Streamlit courante."""
+    try:
+        future = get_pool().submit(func, *args)
+    except BrokenProcessPool:
+        # Un processus a été tué (mémoire, signal) : on repart d'un pool neuf
+        logger.warning("Pool de calcul cassé, redémarrage")
+        shutdown()
+        future = get_pool().submit(func, *args)
+    session_id = _session_id()
+    if session_id is not None:
+        with _lock:
+            _session_futures.setdefault(session_id, set()).add(future)
+        future.add_done_callback(lambda f: _forget(session_id, f))
+    return future
+
+
+def map(func, *iterables):
+    """Soumet une tâche par élément ; renvoie la liste des Future, dans l'ordre."""
+    return [submit(func, *args) for args in zip(*iterables)]
+
+
+def cancel_session(session_id=None):
+    """Annule les tâches en file de la session (la session courante par défaut)."""
+    session_id = session_id or _session_id()
+    with _lock:
+        futures = list(_session_futures.get(session_id, ()))
+    cancelled = sum(future.cancel() for future in futures)
+    if cancelled:
+        logger.info(f"{cancelled} tâche(s) de calcul annulée(s) pour la session {session_id}")
+    return cancelled
+
+
+def _check_interrupted(ctx):
+    """Si la session a demandé une ré-exécution ou un arrêt, annule ses tâches et interrompt le script."""
+    if ctx is None or ctx.script_requests is None:
+        return
+    request = ctx.script_requests.on_scriptrunner_yield()
+    if request is None:
+        return
+    cancel_session(ctx.session_id)
+    if request.type.name == "RERUN":
+        raise RerunException(request.rerun_data)
+    raise StopException()
+
+
+def gather(futures):
+    """Attend les résultats des Future, dans l'ordre. Une erreur d'une tâche est relancée ici."""
+    futures = list(futures)
+    ctx = get_script_run_ctx(suppress_warning=True)
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if not future.cancelled() and future.exception() is not None:
+                for other in pending:
+                    other.cancel()
+                raise future.exception()
+        _check_interrupted(ctx)
+    return [future.result() for future in futures]
+
+
+def run(func, *args):
+    """Exécute `func(*args)` dans le pool et attend son résultat."""
+    return gather([submit(func, *args)])[0]
+
+
+def run_many(func, *iterables):
+    """Exécute `func` sur chaque élément en parallèle ; renvoie les résultats dans l'ordre."""
+    return gather(map(func, *iterables))
+
+
+def spawn_seeds(seed, count):
+    """Graines indépendantes et reproductibles d'une série de tâches (une par tâche, quel que soit le processus)."""
+    return np.random.SeedSequence(seed).spawn(count)
@@ -0,0 +1,64 @@
+"""Sous-échantillonnage des séries avant affichage (Largest-Triangle-Three-Buckets).
+
+Un graphique ne peut pas afficher plus d'un point par pixel : au-delà, les points
+envoyés au navigateur alourdissent le JSON Plotly sans rien changer au tracé. LTTB
+garde dans chaque tranche le point qui forme le plus grand triangle avec ses voisins,
+ce qui conserve les pics, les creux et les ruptures de pente. Pour zoomer, on
+redécoupe la série complète sur la plage demandée avant de la ré-échantillonner :
+un zoom assez étroit revient donc à la pleine résolution.
+"""
+import numpy as np
+import pandas as pd
+
+# Largeurs approximatives (en pixels) des graphiques selon la mise en page Streamlit
+FULL_WIDTH = 1400
+HALF_WIDTH = 700
+POINTS_PER_PIXEL = 1
+
+
+def points_for_width(width):
+    return int(width * POINTS_PER_PIXEL)
+
+
+def lttb_indices(x, y, threshold):
+    """Positions des `threshold` points retenus par LTTB (le premier et le dernier sont toujours gardés)."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # threshold - 2 tranches entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Moyenne de la tranche suivante (le dernier point pour la dernière tranche)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(series, max_points=HALF_WIDTH):
+    """Série réduite à `max_points` points au plus (valeurs manquantes retirées)."""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    index = series.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=float), max_points)]
+
+
+def downsample_frame(frame, max_points=HALF_WIDTH):
+    """Sous-échantillonne chaque colonne séparément ; renvoie {colonne: Series} (une trace par colonne)."""
+    return {column: downsample(frame[column], max_points) for column in frame.columns}
+
+
+def zoom(data, start=None, end=None):
+    """Restreint les données à la plage [start, end], à pleine résolution."""
+    return data.loc[pd.Timestamp(start) if start else None:pd.Timestamp(end) if end else None]
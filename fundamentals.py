@@ -0,0 +1,194 @@
+"""Cache des instantanés `yf.Ticker(...).info` partagé par toutes les pages et sessions.
+
+Streamlit ré-exécute les pages à chaque interaction, mais les modules importés restent
+en mémoire : un seul appel `info` est donc fait par ticker et par fenêtre de TTL.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cachetools
+import pandas as pd
+import yfinance as yf
+
+from data import database
+
+logger = logging.getLogger(__name__)
+
+# Durée de validité d'un instantané (secondes) et nombre maximal de tickers conservés (éviction LRU)
+INFO_TTL = 6 * 60 * 60
+INFO_MAXSIZE = 256
+
+# Nom affiché du KPI -> clé du dictionnaire `info` de yfinance
+KPI_FIELDS = {
+    'returnOnAssets': 'returnOnAssets',
+    'returnOnEquity': 'returnOnEquity',
+    'Net Profit Margin': 'netProfitMargin',
+    'debtToEquity': 'debtToEquity',
+    'trailingPE': 'trailingPE',
+    'ebitda': 'ebitda',
+    'freeCashflow': 'freeCashflow',
+    'trailingEps': 'trailingEps',
+}
+
+# Nombre de téléchargements `info` simultanés lors de la construction de l'index des KPIs
+INDEX_WORKERS = 8
+# Délai (secondes) avant de retenter les tickers dont l'instantané n'a pas pu être téléchargé
+FAILED_RETRY = 5 * 60
+
+_cache = cachetools.TTLCache(maxsize=INFO_MAXSIZE, ttl=INFO_TTL)
+_lock = threading.Lock()
+_fetch_locks = {}  # ticker -> Lock, pour qu'un seul thread télécharge un même ticker
+_index_lock = threading.Lock()
+_kpi_index = None
+
+
+def configure(ttl=None, maxsize=None):
+    """Change la durée de validité et/ou la taille du cache.
+
+    Le cache repart vide : recopier les entrées leur donnerait une nouvelle date d'insertion
+    et prolongerait d'autant des instantanés déjà anciens. Ils sont retéléchargés à la lecture.
+    """
+    global _cache
+    with _lock:
+        _cache = cachetools.TTLCache(
+            maxsize=maxsize if maxsize is not None else _cache.maxsize,
+            ttl=ttl if ttl is not None else _cache.ttl,
+        )
+
+
+def _fetch_info(symbol):
+    return yf.Ticker(symbol).info or {}
+
+
+def get_info(symbol):
+    """Renvoie l'instantané `info` d'un ticker, téléchargé au plus une fois par TTL."""
+    with _lock:
+        if symbol in _cache:
+            return _cache[symbol]
+        fetch_lock = _fetch_locks.setdefault(symbol, threading.Lock())
+
+    with fetch_lock:
+        # Un autre thread a pu remplir le cache pendant l'attente
+        with _lock:
+            if symbol in _cache:
+                return _cache[symbol]
+        logger.info(f"Téléchargement des fondamentaux de {symbol}")
+        info = _fetch_info(symbol)
+        with _lock:
+            _cache[symbol] = info
+        return info
+
+
+def invalidate(symbol=None):
+    """Supprime un ticker du cache, ou tout le cache si aucun ticker n'est donné."""
+    with _lock:
+        if symbol is None:
+            _cache.clear()
+        else:
+            _cache.pop(symbol, None)
+
+
+def get_kpi(symbol, kpi):
+    if kpi not in KPI_FIELDS:
+        raise ValueError(f"Le KPI '{kpi}' n'est pas pris en charge. Veuillez choisir parmi {list(KPI_FIELDS)}.")
+    return get_info(symbol).get(KPI_FIELDS[kpi])
+
+
+class KpiIndex:
+    """Matrice tickers x KPIs et ses agrégats par secteur (médianes et percentiles)."""
+
+    def __init__(self, table, sectors, failed=()):
+        self.table = table
+        self.sectors = sectors
+        # Tickers sans instantané (téléchargement en échec) : leurs KPIs valent NaN
+        self.failed = set(failed)
+        grouped = table.groupby(sectors)
+        self.sector_medians = grouped.median()
+        self.sector_percentiles = grouped.rank(pct=True)
+        self.universe_percentiles = table.rank(pct=True)
+        self.built_at = time.time()
+
+    def value(self, ticker, kpi):
+        value = self.table.at[ticker, kpi]
+        return None if pd.isna(value) else float(value)
+
+    def sector_median(self, sector, kpi):
+        return self.sector_medians.at[sector, kpi]
+
+    def sector_percentile(self, ticker, kpi):
+        return self.sector_percentiles.at[ticker, kpi]
+
+    def universe_percentile(self, ticker, kpi):
+        return self.universe_percentiles.at[ticker, kpi]
+
+    def other_sector_medians(self, sector, kpi):
+        return self.sector_medians[kpi].drop(index=sector, errors='ignore').dropna()
+
+
+def _safe_info(symbol):
+    """Instantané `info` du ticker, ou None si le téléchargement échoue (rien n'est mis en cache)."""
+    try:
+        return get_info(symbol)
+    except Exception as e:
+        logger.error(f"Fondamentaux indisponibles pour {symbol}: {e}")
+        return None
+
+
+def build_kpi_index(entries=database):
+    """Construit l'index des KPIs pour tout l'univers (téléchargements `info` en parallèle)."""
+    tickers = [entry['ticker'] for entry in entries]
+    with ThreadPoolExecutor(max_workers=INDEX_WORKERS) as pool:
+        infos = dict(zip(tickers, pool.map(_safe_info, tickers)))
+    failed = [t for t, info in infos.items() if info is None]
+    infos = {t: info or {} for t, info in infos.items()}
+    table = pd.DataFrame(
+        {kpi: pd.to_numeric(pd.Series([infos[t].get(field) for t in tickers], index=tickers), errors='coerce')
+         for kpi, field in KPI_FIELDS.items()}
+    )
+    table.index.name = 'ticker'
+    sectors = pd.Series({entry['ticker']: entry['domaine'] for entry in entries}, name='domaine')
+    return KpiIndex(table, sectors, failed)
+
+
+def get_kpi_index():
+    """Renvoie l'index des KPIs, reconstruit une fois par fenêtre de TTL des instantanés.
+
+    Si des tickers ont échoué, l'index est reconstruit après FAILED_RETRY : seuls ces tickers
+    sont retéléchargés, les autres instantanés sont lus dans le cache.
+    """
+    global _kpi_index
+    with _index_lock:
+        age = None if _kpi_index is None else time.time() - _kpi_index.built_at
+        if age is None or age > _cache.ttl or (_kpi_index.failed and age > FAILED_RETRY):
+            _kpi_index = build_kpi_index()
+        return _kpi_index
+
+
+def warm(tickers=None, max_workers=INDEX_WORKERS):
+    """Re-télécharge les instantanés avant leur expiration puis reconstruit l'index des KPIs.
+
+    Renvoie un dict {ticker: erreur} ; un échec laisse l'instantané précédent en place.
+    """
+    global _kpi_index
+    tickers = tickers or [entry['ticker'] for entry in database]
+
+    def fetch(symbol):
+        info = _fetch_info(symbol)
+        with _lock:
+            _cache[symbol] = info
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch, symbol): symbol for symbol in tickers}
+        for future, symbol in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failures[symbol] = str(e)
+
+    index = build_kpi_index()
+    with _index_lock:
+        _kpi_index = index
+    return failures
@@ -0,0 +1,104 @@
+"""Instantanés de gouvernance (dirigeants, risques, actionnariat) partagés par toutes les sessions.
+
+Un instantané est construit une seule fois par ticker à partir du cache `fundamentals`
+et conservé GOVERNANCE_TTL secondes : passer d'une entreprise à l'autre ne refait
+ni l'appel `info` ni les recherches web des âges manquants.
+"""
+import logging
+import threading
+
+import cachetools
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import fundamentals
+import scraping
+
+logger = logging.getLogger(__name__)
+
+GOVERNANCE_TTL = 6 * 60 * 60
+GOVERNANCE_MAXSIZE = 64
+
+_cache = cachetools.TTLCache(maxsize=GOVERNANCE_MAXSIZE, ttl=GOVERNANCE_TTL)
+_lock = threading.Lock()
+
+
+def get_age_from_web(name, company):
+    search_query = f"{name} {company} age"
+    url = f"https://www.google.com/search?q={search_query}"
+
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+
+    response = scraping.fetch(url, headers=headers)
+    soup = BeautifulSoup(response.text, 'html.parser')
+
+    # Cette partie est très basique et peut nécessiter des ajustements
+    age_text = soup.find(text=lambda t: t and 'age' in t.lower())
+    if age_text:
+        age = ''.join(filter(str.isdigit, age_text))
+        return age if age else "Non trouvé"
+    return "Non trouvé"
+
+
+class GovernanceSnapshot:
+    """Dirigeants, scores de risque et actionnariat d'une entreprise, lus en un seul appel `info`."""
+
+    def __init__(self, ticker, info):
+        self.ticker = ticker
+        self.company_name = info.get('longName', '')
+        self.industry = info.get('industry')
+        self.business_summary = info.get('longBusinessSummary')
+        self.full_time_employees = info.get('fullTimeEmployees')
+        self.officers = [
+            {
+                "name": officer.get("name", ''),
+                "age": officer.get("age", ''),
+                "title": officer.get("title", ''),
+                "total_pay": officer.get("totalPay", 'Non disponible'),
+            }
+            for officer in info.get("companyOfficers", []) if officer
+        ]
+        self.board_risk = info.get('boardRisk', 'Non disponible')
+        self.risks = {
+            "audit_risk": info.get("auditRisk"),
+            "board_risk": info.get("boardRisk"),
+            "compensation_risk": info.get("compensationRisk"),
+            "shareholder_rights_risk": info.get("shareHolderRightsRisk"),
+            "overall_risk": info.get("overallRisk"),
+        }
+        self.ownership = {
+            "held_percent_insiders": info.get("heldPercentInsiders"),
+            "held_percent_institutions": info.get("heldPercentInstitutions"),
+        }
+
+    def fill_missing_ages(self):
+        # Recherche web uniquement pour les dirigeants dont Yahoo ne fournit pas l'âge, en parallèle
+        missing = [officer for officer in self.officers if not officer["age"]]
+        ages = scraping.run_many(lambda officer: get_age_from_web(officer["name"], self.company_name), missing)
+        for officer, age in zip(missing, ages):
+            officer["age"] = age
+
+    def executives_frame(self):
+        return pd.DataFrame([
+            {
+                'Nom': officer["name"],
+                'Âge': officer["age"],
+                'Position': officer["title"],
+                'Paye annuelle': officer["total_pay"],
+            }
+            for officer in self.officers
+        ])
+
+
+def get_snapshot(ticker):
+    """Renvoie l'instantané de gouvernance d'un ticker, construit au plus une fois par TTL."""
+    with _lock:
+        if ticker in _cache:
+            return _cache[ticker]
+    snapshot = GovernanceSnapshot(ticker, fundamentals.get_info(ticker))
+    snapshot.fill_missing_ages()
+    with _lock:
+        _cache[ticker] = snapshot
+    return snapshot
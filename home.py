@@ -1,14 +1,16 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime
-import boto3
+import aws_clients
 import uuid
 import logging
 from botocore.exceptions import ClientError
 from data import database
+import price_store
+import downsampling
+import prompt_compaction
+import returns_index
 
 # Initialize Bedrock client and agent wrapper
 logging.basicConfig(format='[%(asctime)s] %(levelname)s - %(message)s', level=logging.INFO)
@@ -37,8 +39,8 @@ class BedrockAgentRuntimeWrapper:
             logger.error(f"Couldn't invoke agent. {e}")
             raise
 
-# Bedrock client and wrapper instance
-bedrock_agent_runtime_client = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
+# Shared Bedrock client (created once per process) and wrapper instance
+bedrock_agent_runtime_client = aws_clients.get_client('bedrock-agent-runtime')
 bedrock_wrapper = BedrockAgentRuntimeWrapper(bedrock_agent_runtime_client)
 agent_id = 'ACVSW7ULXC'
 agent_alias_id = 'FGVZUPEISZ'
@@ -78,37 +80,27 @@ with col2:
     )
 
 def calculate_metrics(df):
-    metrics = {}
-    for col in df.columns[1:]:  # Skip the 'Date' column
-        start_value = df[col].iloc[0]
-        end_value = df[col].iloc[-1]
-        if start_value != 0:
-            change = ((end_value - start_value) / start_value) * 100
-        else:
-            change = 0  # Handle division by zero
-        metrics[col] = change
-    return metrics
+    # Variation (en %) entre la première et la dernière valeur de chaque secteur, pour toutes les colonnes d'un coup
+    changes = returns_index.ReturnsIndex(df.set_index('Date')).window()['Rendement'] * 100
+    return changes.fillna(0).to_dict()
 
 def get_data():
-    data = {}
-    for action in database:
-        try:
-            df = yf.download(action['ticker'], period=time_span)["Adj Close"]
-            data[action['domaine']] = data.get(action['domaine'], []) + [df]
-        except Exception as e:
-            pass
-    return data
+    # Un seul téléchargement groupé pour tout l'univers, puis lecture d'un tableau large (dates x tickers)
+    failures = price_store.ensure_fresh()
+    prices = price_store.load_prices(price_store.universe_tickers(), period=time_span)
+    for ticker in prices.columns[prices.isna().all()]:
+        failures.setdefault(ticker, "Aucune donnée sur la période")
+    return prices, failures
 
 with col1:
     # Show a spinner while loading the data and generating the plot
         with st.spinner("AlexIA analyse en temps réel les marchés financiers..."):
-            data = get_data()
-            sector_averages = {}
-            for secteur, valeurs in data.items():
-                combined_df = pd.concat(valeurs, axis=1).mean(axis=1)
-                sector_averages[secteur] = combined_df
-
-            df_plot = pd.DataFrame(sector_averages)
+            prices, failures = get_data()
+            if failures:
+                st.warning(f"Données indisponibles pour : {', '.join(sorted(failures))}")
+            sectors = {action['ticker']: action['domaine'] for action in database}
+            sector_order = list(dict.fromkeys(sectors.values()))
+            df_plot = prices.T.groupby(sectors, sort=False).mean().T.reindex(columns=sector_order).dropna(axis=1, how='all')
             df_plot.reset_index(inplace=True)
             df_plot.rename(columns={"index": "Date"}, inplace=True)
 
@@ -127,13 +119,22 @@ with col1:
             ]
 
 
+            # Une trace par secteur, réduite à la largeur du graphique (les métriques gardent la série complète) ;
+            # le zoom redécoupe la série complète, donc une plage étroite s'affiche à pleine résolution
+            df_chart = df_plot.set_index('Date')
+            if len(df_chart) > 1:
+                first_day, last_day = df_chart.index.min().date(), df_chart.index.max().date()
+                zoom_start, zoom_end = st.slider("Zoom sur la période", min_value=first_day, max_value=last_day, value=(first_day, last_day), format="DD/MM/YYYY")
+                df_chart = downsampling.zoom(df_chart, zoom_start, zoom_end)
+            traces = downsampling.downsample_frame(df_chart, downsampling.points_for_width(downsampling.FULL_WIDTH))
+
             fig = make_subplots(specs=[[{"secondary_y": True}]])
             indice = 0
             for col in df_plot.columns[1:]:
                 
                 if col != "Technologie":
                     fig.add_trace(
-                        go.Scatter(x=df_plot['Date'], y=df_plot[col], name=col, line=dict(color=colors[indice])),
+                        go.Scatter(x=traces[col].index, y=traces[col], name=col, line=dict(color=colors[indice])),
                         secondary_y=False
                     )
                 else:
@@ -141,7 +142,7 @@ with col1:
                 indice +=1
                 
             fig.add_trace(
-                go.Scatter(x=df_plot['Date'], y=df_plot['Technologie'], name='Technologie', line=dict(color=colors[index_tech])),
+                go.Scatter(x=traces['Technologie'].index, y=traces['Technologie'], name='Technologie', line=dict(color=colors[index_tech])),
                 secondary_y=True
             )
 
@@ -168,29 +169,29 @@ with col1:
             )
 
         st.plotly_chart(fig)
+
+        # Rendement moyen des entreprises de chaque secteur sur plusieurs périodes
+        grid = returns_index.get_index().grid() * 100
+        sector_grid = grid.groupby(sectors, sort=False).mean().reindex(sector_order).dropna(how='all')
+        st.write("##### Rendement moyen par secteur et par période (%)")
+        st.dataframe(sector_grid.style.format("{:.2f}"), use_container_width=True)
         # Function to calculate percentage change for each sector
 
 
 
 
-# Downsample data only for the LLM prompt
-def get_downsampled_prompt(df, max_points=30):
-    downsampled_data = []
-    for col in df.columns[1:]:
-        series = df[['Date', col]].dropna()
-        if len(series) > max_points:
-            n = len(series) // max_points
-            series = series.iloc[::n]  # Keep every nth row
-        downsampled_data.append((col, series))
-    return downsampled_data
+# Budget de tokens des données du prompt : la taille du prompt ne dépend pas de la période choisie
+PROMPT_TOKEN_BUDGET = 1200
+
+# Points clés de chaque secteur (extrema, ruptures de tendance) pour le prompt de l'agent
+def get_downsampled_prompt(df, token_budget=PROMPT_TOKEN_BUDGET):
+    return prompt_compaction.compact_frame(df.set_index('Date'), token_budget)
 
 # Create prompt text with downsampled data
 prompt = "Analyse the following stock performance trends:\n\n. Begin with an introductory sentence. Then please ensure that the format is readable with nice breaf and separated individual paragraphs. Finish with a comparative summary at the end. Write in French. \n\n"
-prompt += """Now let's get started with the data:\n\n"""
-downsampled_data = get_downsampled_prompt(df_plot)
-for col, series in downsampled_data:
-    trend_data = series.to_string(index=False)
-    prompt += f"Secteur: {col}\n{trend_data}\n\n"
+prompt += """Now let's get started with the data (date value pairs at the key points of each series):\n\n"""
+prompt += get_downsampled_prompt(df_plot)
+logger.info(f"Prompt de tendance : environ {prompt_compaction.estimate_tokens(prompt)} tokens")
 
 session_id = str(uuid.uuid1())
 st.subheader("Analyse des tendances de performance boursière pour chaque secteurs")
@@ -0,0 +1,221 @@
+"""État incrémental des indicateurs techniques, mis à jour barre par barre.
+
+Chaque objet garde juste ce qu'il faut pour intégrer une nouvelle barre en O(1)
+(sommes glissantes, dernières EMA, cumul OBV) et se sérialise en JSON, ce qui permet
+de reprendre le calcul là où il s'était arrêté au lieu de recalculer tout l'historique.
+Les valeurs obtenues sont celles de `indicators.compute_panel` sur l'historique complet.
+Le screener lit ces points de reprise.
+"""
+import json
+import math
+import os
+from collections import deque
+
+import pandas as pd
+
+import price_store
+from indicators import (
+    RSI_WINDOW, MACD_SHORT, MACD_LONG, MACD_SIGNAL, BOLLINGER_WINDOW, CROSS_LOOKBACK, OBV_TREND_WINDOW,
+)
+
+STATE_DIR = os.path.join(price_store.STORE_DIR, "indicators")
+# Incrémenté quand le contenu d'un point de reprise change : les anciens sont reconstruits
+STATE_VERSION = 2
+
+
+class RollingWindow:
+    """Fenêtre glissante avec somme et somme des carrés tenues à jour en O(1)."""
+
+    def __init__(self, size, values=()):
+        self.size = size
+        self.values = deque(values, maxlen=size)
+        self._resum()
+
+    def _resum(self):
+        # Recalcul exact périodique pour que les erreurs d'arrondi ne s'accumulent pas
+        self.total = math.fsum(self.values)
+        self.total_sq = math.fsum(v * v for v in self.values)
+        self._updates = 0
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        self._updates += 1
+        if self._updates >= self.size:
+            self._resum()
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def mean(self):
+        return self.total / self.size if self.full else math.nan
+
+    def std(self):
+        if not self.full:
+            return math.nan
+        var = (self.total_sq - self.total * self.total / self.size) / (self.size - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class EMAState:
+    def __init__(self, span, value=None):
+        self.alpha = 2.0 / (span + 1.0)
+        self.span = span
+        self.value = value
+
+    def update(self, x):
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class TickerIndicators:
+    """RSI, MACD, OBV et bandes de Bollinger d'un ticker, mis à jour barre par barre."""
+
+    def __init__(self):
+        self.last_date = None
+        self.last_close = None
+        self.gains = RollingWindow(RSI_WINDOW)
+        self.losses = RollingWindow(RSI_WINDOW)
+        self.ema_short = EMAState(MACD_SHORT)
+        self.ema_long = EMAState(MACD_LONG)
+        self.signal = EMAState(MACD_SIGNAL)
+        self.obv = 0.0
+        self.closes = RollingWindow(BOLLINGER_WINDOW)
+        # Dernières valeurs gardées pour les signaux du screener (croisements, tendance de l'OBV)
+        self.spreads = deque(maxlen=CROSS_LOOKBACK + 1)
+        self.recent_obv = deque(maxlen=OBV_TREND_WINDOW)
+        self.recent_volumes = deque(maxlen=OBV_TREND_WINDOW)
+
+    def update(self, date, close, volume):
+        delta = 0.0 if self.last_close is None else close - self.last_close
+        self.gains.push(max(delta, 0.0))
+        self.losses.push(max(-delta, 0.0))
+        macd = self.ema_short.update(close) - self.ema_long.update(close)
+        self.spreads.append(macd - self.signal.update(macd))
+        if delta and not math.isnan(volume):
+            self.obv += math.copysign(volume, delta)
+        self.recent_obv.append(self.obv)
+        self.recent_volumes.append(volume)
+        self.closes.push(close)
+        self.last_date = pd.Timestamp(date)
+        self.last_close = close
+
+    def update_bars(self, bars):
+        """Intègre les barres (colonnes Close et Volume) postérieures à la dernière date connue."""
+        if self.last_date is not None:
+            bars = bars[bars.index > self.last_date]
+        for date, close, volume in zip(bars.index, bars['Close'], bars['Volume'].fillna(0)):
+            if not math.isnan(close):
+                self.update(date, float(close), float(volume))
+        return self
+
+    def values(self):
+        gain, loss = self.gains.mean(), self.losses.mean()
+        if loss == 0:
+            rsi = math.nan if gain == 0 else 100.0
+        else:
+            rsi = 100 - 100 / (1 + gain / loss)
+        mean, std = self.closes.mean(), self.closes.std()
+        macd = self.ema_short.value - self.ema_long.value if self.ema_short.value is not None else math.nan
+        return {
+            'RSI': rsi,
+            'MACD': macd,
+            'Signal_Line': self.signal.value if self.signal.value is not None else math.nan,
+            'OBV': self.obv,
+            'Rolling Mean': mean,
+            'Upper Band': mean + 2 * std,
+            'Lower Band': mean - 2 * std,
+        }
+
+    def to_dict(self):
+        return {
+            'version': STATE_VERSION,
+            'last_date': self.last_date.isoformat() if self.last_date is not None else None,
+            'last_close': self.last_close,
+            'gains': list(self.gains.values),
+            'losses': list(self.losses.values),
+            'ema_short': self.ema_short.value,
+            'ema_long': self.ema_long.value,
+            'signal': self.signal.value,
+            'obv': self.obv,
+            'closes': list(self.closes.values),
+            'spreads': list(self.spreads),
+            'recent_obv': list(self.recent_obv),
+            'recent_volumes': list(self.recent_volumes),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        self = cls()
+        self.last_date = pd.Timestamp(state['last_date']) if state['last_date'] else None
+        self.last_close = state['last_close']
+        self.gains = RollingWindow(RSI_WINDOW, state['gains'])
+        self.losses = RollingWindow(RSI_WINDOW, state['losses'])
+        self.ema_short.value = state['ema_short']
+        self.ema_long.value = state['ema_long']
+        self.signal.value = state['signal']
+        self.obv = state['obv']
+        self.closes = RollingWindow(BOLLINGER_WINDOW, state['closes'])
+        self.spreads.extend(state['spreads'])
+        self.recent_obv.extend(state['recent_obv'])
+        self.recent_volumes.extend(state['recent_volumes'])
+        return self
+
+
+def _path(ticker):
+    return os.path.join(STATE_DIR, f"{ticker}.json")
+
+
+def load_state(ticker):
+    path = _path(ticker)
+    if not os.path.exists(path):
+        return TickerIndicators()
+    with open(path) as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return TickerIndicators()
+    return TickerIndicators.from_dict(state)
+
+
+def save_state(ticker, state):
+    payload = json.dumps(state.to_dict()).encode()
+    price_store.atomic_write(_path(ticker), lambda f: f.write(payload))
+
+
+def update_ticker(ticker, state=None):
+    """Met à jour le point de reprise d'un ticker avec les nouvelles barres du stockage de prix."""
+    bars = price_store.read_ticker(ticker)
+    state = load_state(ticker) if state is None else state
+    # Un rechargement de l'historique (dividende, division) invalide le point de reprise
+    if state.last_date is not None and (
+        state.last_date not in bars.index or bars.at[state.last_date, 'Close'] != state.last_close
+    ):
+        state = TickerIndicators()
+    state.update_bars(bars)
+    save_state(ticker, state)
+    return state
+
+
+def cached_state(ticker):
+    """Point de reprise existant, complété par les nouvelles barres si le fichier de prix a changé
+    depuis ; None s'il n'y en a pas encore (il faudrait parcourir tout l'historique barre par barre)."""
+    path, prices_mtime = _path(ticker), price_store.stored_mtime(ticker)
+    if not os.path.exists(path):
+        return None
+    fresh = prices_mtime is None or os.path.getmtime(path) >= prices_mtime
+    state = load_state(ticker)
+    if state.last_date is None:
+        return None
+    return state if fresh else update_ticker(ticker, state)
+
+
+def update_universe(tickers=None):
+    """Met à jour les indicateurs de tout l'univers ; renvoie un DataFrame tickers x indicateurs."""
+    tickers = tickers or price_store.universe_tickers()
+    return pd.DataFrame({ticker: update_ticker(ticker).values() for ticker in tickers}).T
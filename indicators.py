@@ -0,0 +1,149 @@
+"""Indicateurs techniques calculés sur un panneau large (dates x tickers).
+
+Chaque indicateur est calculé pour tous les tickers en une seule passe sur des tableaux
+NumPy, avec les mêmes conventions que les calculs pandas par ticker (`rolling(...).mean()`,
+`ewm(span, adjust=False)`). Les trous isolés d'un ticker sont comblés par la dernière
+valeur connue ; les lignes antérieures à sa première cotation restent vides.
+"""
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+RSI_WINDOW = 14
+MACD_SHORT, MACD_LONG, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_WINDOW = 20
+# Signaux du screener : croisements MACD des dernières séances et pente récente de l'OBV
+CROSS_LOOKBACK = 5
+OBV_TREND_WINDOW = 20
+
+
+def _prepare(close):
+    """Renvoie (valeurs comblées, masque des lignes à partir de la première cotation de chaque ticker)."""
+    values = np.asarray(close, dtype=float)
+    started = np.maximum.accumulate(~np.isnan(values), axis=0)
+    filled = pd.DataFrame(values).ffill().bfill().to_numpy()
+    return filled, started
+
+
+def rolling_mean(values, started, window):
+    """Moyenne glissante (min_periods=window) ne comptant que les lignes cotées."""
+    x = np.where(started, values, 0.0)
+    csum = np.cumsum(x, axis=0)
+    count = np.cumsum(started, axis=0)
+    csum[window:] = csum[window:] - csum[:-window].copy()
+    count[window:] = count[window:] - count[:-window].copy()
+    return np.where(count == window, csum / window, np.nan)
+
+
+def rolling_std(values, started, window):
+    """Écart-type glissant (ddof=1), centré sur la première valeur pour limiter les erreurs d'arrondi."""
+    centered = values - values[:1]
+    mean = rolling_mean(centered, started, window)
+    mean_sq = rolling_mean(centered ** 2, started, window)
+    var = (mean_sq - mean ** 2) * window / (window - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def ema(values, started, span):
+    """Moyenne mobile exponentielle `adjust=False` de chaque colonne, via un filtre récursif."""
+    alpha = 2.0 / (span + 1.0)
+    # Les lignes avant la première cotation valent la première valeur : l'EMA y reste constante
+    result = lfilter([alpha], [1.0, alpha - 1.0], values, axis=0, zi=(1.0 - alpha) * values[:1])[0]
+    return np.where(started, result, np.nan)
+
+
+# Registre : nom -> (dépendances, fonction). Les noms en majuscules sont les sorties affichables,
+# les autres sont des intermédiaires partagés (différences de clôture, moyennes glissantes, EMA).
+REGISTRY = {}
+OUTPUTS = ['RSI', 'MACD', 'Signal_Line', 'OBV', 'Rolling Mean', 'Upper Band', 'Lower Band']
+
+
+def register(name, *dependencies):
+    def decorator(func):
+        REGISTRY[name] = (dependencies, func)
+        return func
+    return decorator
+
+
+register('prepared', 'close')(_prepare)
+register('diff', 'prepared')(lambda prepared: np.diff(prepared[0], axis=0, prepend=prepared[0][:1]))
+register('gain_mean', 'diff', 'prepared')(
+    lambda diff, prepared: rolling_mean(np.where(diff > 0, diff, 0.0), prepared[1], RSI_WINDOW))
+register('loss_mean', 'diff', 'prepared')(
+    lambda diff, prepared: rolling_mean(np.where(diff < 0, -diff, 0.0), prepared[1], RSI_WINDOW))
+register('ema_short', 'prepared')(lambda prepared: ema(*prepared, MACD_SHORT))
+register('ema_long', 'prepared')(lambda prepared: ema(*prepared, MACD_LONG))
+register('rolling_mean', 'prepared')(lambda prepared: rolling_mean(*prepared, BOLLINGER_WINDOW))
+register('rolling_std', 'prepared')(lambda prepared: rolling_std(*prepared, BOLLINGER_WINDOW))
+
+
+@register('RSI', 'gain_mean', 'loss_mean')
+def _rsi_node(gain, loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+register('MACD', 'ema_short', 'ema_long')(lambda short, long: short - long)
+
+
+@register('Signal_Line', 'MACD', 'prepared')
+def _signal_node(line, prepared):
+    # Avant la première cotation, la ligne MACD non masquée vaut 0 : remplir par 0 garde l'EMA exacte
+    started = prepared[1]
+    return ema(np.where(started, line, 0.0), started, MACD_SIGNAL)
+
+
+@register('OBV', 'diff', 'prepared', 'volume')
+def _obv_node(diff, prepared, volume):
+    flow = np.nan_to_num(np.sign(diff) * volume)
+    return np.where(prepared[1], np.cumsum(flow, axis=0), np.nan)
+
+
+register('Rolling Mean', 'rolling_mean')(lambda mean: mean)
+register('Upper Band', 'rolling_mean', 'rolling_std')(lambda mean, std: mean + 2 * std)
+register('Lower Band', 'rolling_mean', 'rolling_std')(lambda mean, std: mean - 2 * std)
+
+
+class IndicatorPanel:
+    """Évaluation paresseuse des indicateurs d'un panneau de clôtures.
+
+    Un indicateur n'est calculé que lorsqu'il est demandé, avec ses seules dépendances ;
+    les intermédiaires (différences, moyennes glissantes, EMA) sont mémoïsés et partagés.
+    `volume` peut être un DataFrame ou une fonction qui le charge au premier besoin (OBV).
+    """
+
+    def __init__(self, close, volume=None):
+        self.close = close
+        self._volume = volume
+        self._values = {'close': close}
+
+    def _resolve(self, name):
+        if name not in self._values:
+            if name == 'volume':
+                volume = self._volume() if callable(self._volume) else self._volume
+                if volume is None:
+                    raise ValueError("L'OBV nécessite les volumes.")
+                self._values[name] = volume.reindex_like(self.close).fillna(0).to_numpy(dtype=float)
+            else:
+                dependencies, func = REGISTRY[name]
+                self._values[name] = func(*(self._resolve(dependency) for dependency in dependencies))
+        return self._values[name]
+
+    def __getitem__(self, name):
+        return pd.DataFrame(self._resolve(name), index=self.close.index, columns=self.close.columns)
+
+    def computed(self):
+        """Noms déjà évalués (utile pour vérifier que seul le nécessaire a été calculé)."""
+        return [name for name in self._values if name in REGISTRY]
+
+    def compute(self, names=OUTPUTS):
+        return {name: self[name] for name in names}
+
+
+def compute_panel(close, volume=None):
+    """Calcule RSI, MACD, OBV et bandes de Bollinger pour toutes les colonnes de `close`.
+
+    Renvoie un dict {nom de l'indicateur: DataFrame dates x tickers}.
+    """
+    names = OUTPUTS if volume is not None else [name for name in OUTPUTS if name != 'OBV']
+    return IndicatorPanel(close, volume).compute(names)
@@ -0,0 +1,250 @@
+"""Stockage local des séries Statistique Canada utilisées par l'analyse économique.
+
+Seules les lignes utiles (Canada, depuis 2014, catégories choisies) et les colonnes
+REF_DATE / VECTOR / VALUE sont conservées, en Parquet. Une série n'est mise à jour
+qu'une fois sa prochaine publication attendue passée, d'après la fréquence du tableau.
+
+Le tableau complet n'est téléchargé qu'une fois, pour traduire les filtres en numéros
+de vecteurs ; les mises à jour suivantes ne demandent que ces vecteurs, à partir de la
+dernière REF_DATE stockée.
+"""
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+import stats_can
+from stats_can import scwds
+
+from price_store import STORE_DIR, atomic_write
+
+logger = logging.getLogger(__name__)
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "csv_analyse_glob")
+# Extraits de démonstration (Canada, depuis 2014) qui correspondent aux filtres de INDICATORS
+LOCAL_SOURCE_DIR = os.path.join(CSV_DIR, "synthetic")
+MACRO_DIR = os.path.join(STORE_DIR, "macro")
+META_PATH = os.path.join(MACRO_DIR, "meta.json")
+START_DATE = pd.Timestamp("2014-01-01")
+COLUMNS = ["REF_DATE", "VECTOR", "VALUE"]
+
+# Une fois la publication attendue passée, Statistique Canada est interrogé au plus une fois par CHECK_INTERVAL
+CHECK_INTERVAL = pd.Timedelta(hours=12)
+
+FREQUENCIES = {
+    'monthly': pd.DateOffset(months=1),
+    'quarterly': pd.DateOffset(months=3),
+    'annual': pd.DateOffset(years=1),
+}
+
+# `lag` : délai approximatif (jours) entre la fin d'une période et sa publication
+INDICATORS = {
+    'consumer_spending': {
+        'table': '36-10-0101-01',
+        'filters': {'Quintile': 'All quintiles', 'Socio-demographic characteristics': 'All households'},
+        'frequency': 'annual',
+        'lag': 270,
+    },
+    'interest_rate': {
+        'table': '10-10-0122-01',
+        'filters': {'Rates': 'Bank rate'},
+        'frequency': 'monthly',
+        'lag': 20,
+    },
+    'gdp': {
+        'table': '36-10-0104-01',
+        'filters': {
+            'Prices': 'Chained (2017) dollars percentage change',
+            'Seasonal adjustment': 'Seasonally adjusted at annual rates',
+            'Estimates': 'Gross domestic product at market prices'
+        },
+        'frequency': 'quarterly',
+        'lag': 55,
+    },
+    'inflation': {
+        'table': '18-10-0004-01',
+        'filters': {'Products and product groups': 'All-items'},
+        'frequency': 'monthly',
+        'lag': 20,
+    },
+}
+
+
+
+class StatsCanSource:
+    """Accès au service web de Statistique Canada."""
+
+    def fetch_table(self, table_id):
+        return stats_can.table_to_df(table_id)
+
+    def fetch_vectors(self, vectors, start_ref_date, end_ref_date):
+        """Renvoie les points (REF_DATE, VECTOR, VALUE) des vecteurs entre deux périodes de référence."""
+        rows = []
+        for vector in scwds.get_bulk_vector_data_by_reference_period_range(
+            vectors, start_ref_date.date(), end_ref_date.date()
+        ):
+            for point in vector.get("vectorDataPoint") or []:
+                rows.append({'REF_DATE': point["refPer"], 'VECTOR': f"v{vector['vectorId']}", 'VALUE': point["value"]})
+        return pd.DataFrame(rows, columns=COLUMNS)
+
+
+class LocalSource:
+    """Remplaçant hors ligne de StatsCanSource, alimenté par des extraits CSV au format Statistique Canada.
+
+    Les fichiers de csv_analyse_glob/synthetic/ sont des séries synthétiques : ils ont les
+    colonnes et les filtres des tableaux officiels, mais des valeurs fabriquées et des numéros
+    de vecteurs fictifs (v9000001 et suivants). Ils servent aux tests et au travail hors
+    ligne, pas à l'analyse.
+    """
+
+    CSV_FILES = {
+        '36-10-0101-01': 'Consumer_Spending.csv',
+        '10-10-0122-01': 'Interest_Rate.csv',
+        '36-10-0104-01': 'GDP.csv',
+        '18-10-0004-01': 'Inflation.csv',
+    }
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    @classmethod
+    def from_csv_dir(cls, directory=LOCAL_SOURCE_DIR):
+        return cls({
+            table_id: pd.read_csv(os.path.join(directory, filename))
+            for table_id, filename in cls.CSV_FILES.items()
+            if os.path.exists(os.path.join(directory, filename))
+        })
+
+    def fetch_table(self, table_id):
+        return self.tables[table_id].copy()
+
+    def fetch_vectors(self, vectors, start_ref_date, end_ref_date):
+        frames = [df[['REF_DATE', 'VECTOR', 'VALUE']] for df in self.tables.values()]
+        df = pd.concat(frames, ignore_index=True)
+        ref_date = pd.to_datetime(df['REF_DATE'])
+        return df[df['VECTOR'].isin(vectors) & (ref_date >= start_ref_date) & (ref_date <= end_ref_date)]
+
+
+source = StatsCanSource()
+_lock = threading.Lock()
+
+
+def set_source(new_source):
+    """Remplace la source de données (ex. LocalSource pour les tests ou le travail hors ligne)."""
+    global source
+    source = new_source
+
+
+def _path(name):
+    return os.path.join(MACRO_DIR, f"{name}.parquet")
+
+
+def _read_meta():
+    if not os.path.exists(META_PATH):
+        return {}
+    with open(META_PATH) as f:
+        return json.load(f)
+
+
+def _write_meta(meta):
+    payload = json.dumps(meta, indent=2).encode()
+    atomic_write(META_PATH, lambda f: f.write(payload))
+
+
+def read_series(name):
+    path = _path(name)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.read_parquet(path)
+
+
+def write_series(name, df):
+    atomic_write(_path(name), lambda f: df.to_parquet(f, engine="pyarrow", index=False))
+
+
+def _clean(df):
+    return pd.DataFrame({
+        'REF_DATE': pd.to_datetime(df['REF_DATE']),
+        'VECTOR': df['VECTOR'].astype(str),
+        'VALUE': pd.to_numeric(df['VALUE'], errors='coerce').astype(float),
+    }).reset_index(drop=True)
+
+
+def filter_table(df, spec):
+    """Applique les filtres d'un indicateur à un tableau complet et ne garde que les colonnes utiles."""
+    ref_date = pd.to_datetime(df['REF_DATE'])
+    mask = (df['GEO'] == 'Canada') & (ref_date >= START_DATE)
+    for column, value in spec['filters'].items():
+        mask &= df[column] == value
+    return _clean(df[mask]).sort_values('REF_DATE').reset_index(drop=True)
+
+
+def next_release(name, series=None):
+    """Date à partir de laquelle une nouvelle période est attendue pour un indicateur."""
+    spec = INDICATORS[name]
+    series = read_series(name) if series is None else series
+    if series.empty:
+        return pd.Timestamp.min
+    return series['REF_DATE'].max() + FREQUENCIES[spec['frequency']] + pd.Timedelta(days=spec['lag'])
+
+
+def is_stale(name, meta=None, now=None):
+    meta = _read_meta() if meta is None else meta
+    now = now or pd.Timestamp.now()
+    checked_at = meta.get(name, {}).get('checked_at')
+    if checked_at is None:
+        return True
+    return now >= next_release(name) and now - pd.Timestamp(checked_at) > CHECK_INTERVAL
+
+
+def refresh_series(name, meta):
+    """Met à jour une série : tableau complet la première fois, puis seulement ses vecteurs."""
+    spec = INDICATORS[name]
+    stored = read_series(name)
+    vectors = meta.get(name, {}).get('vectors')
+
+    if stored.empty or not vectors:
+        logger.info(f"Téléchargement du tableau {spec['table']} ({name})")
+        series = filter_table(source.fetch_table(spec['table']), spec)
+        if series.empty:
+            # Une série vide n'est pas enregistrée : la copie locale ou l'erreur prend le relais
+            raise ValueError(f"Aucune ligne du tableau {spec['table']} ne correspond aux filtres de {name}")
+        meta.setdefault(name, {})['vectors'] = sorted(series['VECTOR'].unique().tolist())
+    else:
+        # On repart de la dernière période stockée pour récupérer aussi ses révisions éventuelles
+        start = stored['REF_DATE'].max()
+        fresh = _clean(source.fetch_vectors(vectors, start, pd.Timestamp.today().normalize()))
+        logger.info(f"{len(fresh)} points reçus pour {name} ({', '.join(vectors)}) depuis {start:%Y-%m-%d}")
+        series = pd.concat([stored, fresh], ignore_index=True)
+        series = series.drop_duplicates(['REF_DATE', 'VECTOR'], keep='last').sort_values('REF_DATE')
+        series = series.reset_index(drop=True)
+    write_series(name, series)
+    return series
+
+
+def load_series(name):
+    """Renvoie la série filtrée d'un indicateur, rafraîchie seulement si une publication est attendue."""
+    with _lock:
+        meta = _read_meta()
+        if is_stale(name, meta):
+            try:
+                refresh_series(name, meta)
+            except Exception as e:
+                if read_series(name).empty:
+                    raise
+                logger.error(f"Rafraîchissement de {name} impossible, utilisation des données locales : {e}")
+            meta.setdefault(name, {})['checked_at'] = pd.Timestamp.now().isoformat()
+            _write_meta(meta)
+    return read_series(name)
+
+
+def refresh_all():
+    """Rafraîchit les indicateurs dont une publication est attendue ; renvoie {indicateur: erreur}."""
+    failures = {}
+    for name in INDICATORS:
+        try:
+            load_series(name)
+        except Exception as e:
+            failures[name] = str(e)
+    return failures
@@ -0,0 +1,225 @@
+"""Construction de portefeuilles à partir des rendements annualisés et de la covariance.
+
+Les portefeuilles optimaux (variance minimale, Sharpe maximal, frontière efficiente) sont
+obtenus par optimisation moyenne-variance (SLSQP, gradients analytiques), avec poids
+positifs, poids maximal par action et plafond par secteur. Le ratio de Sharpe n'est pas
+convexe : son maximum est obtenu par le programme quadratique convexe équivalent, et le
+rendement maximal par un programme linéaire (HiGHS).
+"""
+import numpy as np
+from scipy.optimize import linprog, minimize
+
+
+class Portfolio:
+    """Poids d'un portefeuille et ses statistiques annualisées."""
+
+    def __init__(self, weights, mean, cov):
+        self.weights = np.asarray(weights, dtype=float)
+        self.expected_return = float(self.weights @ np.asarray(mean, dtype=float))
+        self.total_risk = float(self.weights @ np.asarray(cov, dtype=float) @ self.weights)
+        # Les erreurs d'arrondi peuvent donner une variance très légèrement négative
+        self.volatility = float(np.sqrt(max(self.total_risk, 0.0)))
+        self.sharpe = self.expected_return / self.volatility if self.volatility > 0 else np.nan
+
+
+class Constraints:
+    """Contraintes de poids : positifs (long_only), plafond par action et par secteur.
+
+    `sectors` donne le secteur de chaque actif, dans l'ordre des poids. Les contraintes
+    sont des méthodes (et non des lambdas) pour pouvoir être envoyées au pool de calcul.
+    """
+
+    def __init__(self, num_assets, long_only=True, max_weight=1.0, sectors=None, max_sector_weight=1.0):
+        if max_weight * num_assets < 1:
+            raise ValueError(f"Poids maximal {max_weight:.0%} trop faible pour {num_assets} actif(s).")
+        self.num_assets = num_assets
+        self.long_only = long_only
+        self.max_weight = max_weight
+        self.bounds = [(0.0 if long_only else -max_weight, max_weight)] * num_assets
+        self.constraints = [{'type': 'eq', 'fun': self._budget, 'jac': self._budget_jac}]
+        self.max_sector_weight = max_sector_weight
+        self.membership = None
+        if sectors is not None and max_sector_weight < 1:
+            names = list(dict.fromkeys(sectors))
+            if max_sector_weight * len(names) < 1:
+                raise ValueError(f"Plafond sectoriel {max_sector_weight:.0%} trop faible pour {len(names)} secteur(s).")
+            self.membership = np.array([[sector == name for sector in sectors] for name in names], dtype=float)
+            # Chaque secteur ne peut recevoir que le plus petit de son plafond et de ses plafonds par action
+            investable = np.minimum(max_sector_weight, self.membership.sum(axis=1) * max_weight).sum()
+            if investable < 1 - 1e-9:
+                raise ValueError(
+                    f"Plafonds de {max_weight:.0%} par action et {max_sector_weight:.0%} par secteur incompatibles : "
+                    f"au plus {investable:.0%} du budget peut être investi."
+                )
+            self.constraints.append({'type': 'ineq', 'fun': self._sector_cap, 'jac': self._sector_cap_jac})
+
+    def _budget(self, w):
+        return w.sum() - 1.0
+
+    def _budget_jac(self, w):
+        return np.ones_like(w)
+
+    def _sector_cap(self, w):
+        return self.max_sector_weight - self.membership @ w
+
+    def _sector_cap_jac(self, w):
+        return -self.membership
+
+    def start(self):
+        return np.full(self.num_assets, 1.0 / self.num_assets)
+
+
+def _solve(objective, constraints, extra=(), start=None):
+    result = minimize(
+        objective, constraints.start() if start is None else start, jac=True, method='SLSQP',
+        bounds=constraints.bounds, constraints=constraints.constraints + list(extra),
+        options={'maxiter': 500, 'ftol': 1e-12},
+    )
+    if not result.success:
+        raise ValueError(f"Optimisation impossible : {result.message}")
+    # Les très petits poids négatifs sont des erreurs d'arrondi du solveur
+    weights = np.where(np.abs(result.x) < 1e-10, 0.0, result.x)
+    return weights / weights.sum()
+
+
+def _constraints(num_assets, constraints):
+    return constraints if constraints is not None else Constraints(num_assets)
+
+
+def _variance(cov):
+    def objective(w):
+        cw = cov @ w
+        return w @ cw, 2 * cw
+    return objective
+
+
+def min_variance(mean, cov, constraints=None):
+    """Portefeuille de variance minimale."""
+    mean, cov = np.asarray(mean, dtype=float), np.asarray(cov, dtype=float)
+    constraints = _constraints(len(mean), constraints)
+    return Portfolio(_solve(_variance(cov), constraints), mean, cov)
+
+
+def _max_return_weights(mean, constraints):
+    """Poids du portefeuille de rendement maximal sous les contraintes (programme linéaire)."""
+    sector_caps = {}
+    if constraints.membership is not None:
+        sector_caps = {'A_ub': constraints.membership, 'b_ub': np.full(len(constraints.membership), constraints.max_sector_weight)}
+    result = linprog(
+        -mean, A_eq=np.ones((1, len(mean))), b_eq=[1.0], bounds=constraints.bounds, method='highs', **sector_caps
+    )
+    if not result.success:
+        raise ValueError(f"Optimisation impossible : {result.message}")
+    return result.x
+
+
+def max_sharpe(mean, cov, constraints=None):
+    """Portefeuille de ratio de Sharpe maximal (rendement / volatilité).
+
+    Avec w = y / κ, maximiser le ratio de Sharpe revient au programme quadratique convexe
+    min yᵀΣy sous μᵀy = 1, Σy = κ ≥ 0, et les plafonds (par action et par secteur)
+    multipliés par κ. Le départ est le portefeuille de rendement maximal, déjà admissible.
+    """
+    mean, cov = np.asarray(mean, dtype=float), np.asarray(cov, dtype=float)
+    constraints = _constraints(len(mean), constraints)
+    n = len(mean)
+    start = _max_return_weights(mean, constraints)
+    if start @ mean <= 0:
+        raise ValueError("Aucun portefeuille de rendement attendu positif sous ces contraintes.")
+    kappa = 1.0 / (start @ mean)
+
+    def objective(x):
+        cy = cov @ x[:n]
+        return x[:n] @ cy, np.append(2 * cy, 0.0)
+
+    scaled = [
+        {'type': 'eq', 'fun': lambda x: mean @ x[:n] - 1.0, 'jac': lambda x: np.append(mean, 0.0)},
+        {'type': 'eq', 'fun': lambda x: x[:n].sum() - x[n], 'jac': lambda x: np.append(np.ones(n), -1.0)},
+    ]
+    if constraints.max_weight < 1 or not constraints.long_only:
+        cap_jac = np.hstack([-np.eye(n), np.full((n, 1), constraints.max_weight)])
+        scaled.append({'type': 'ineq', 'fun': lambda x: constraints.max_weight * x[n] - x[:n], 'jac': lambda x: cap_jac})
+    if not constraints.long_only:
+        floor_jac = np.hstack([np.eye(n), np.full((n, 1), constraints.max_weight)])
+        scaled.append({'type': 'ineq', 'fun': lambda x: x[:n] + constraints.max_weight * x[n], 'jac': lambda x: floor_jac})
+    if constraints.membership is not None:
+        membership = constraints.membership
+        sector_jac = np.hstack([-membership, np.full((len(membership), 1), constraints.max_sector_weight)])
+        scaled.append({
+            'type': 'ineq', 'fun': lambda x: constraints.max_sector_weight * x[n] - membership @ x[:n], 'jac': lambda x: sector_jac,
+        })
+    bounds = [(0.0 if constraints.long_only else None, None)] * n + [(0.0, None)]
+    result = minimize(
+        objective, np.append(start * kappa, kappa), jac=True, method='SLSQP', bounds=bounds, constraints=scaled,
+        options={'maxiter': 500, 'ftol': 1e-14},
+    )
+    if not result.success or result.x[n] <= 0:
+        raise ValueError(f"Optimisation impossible : {result.message}")
+    weights = result.x[:n] / result.x[n]
+    weights = np.where(np.abs(weights) < 1e-10, 0.0, weights)
+    return Portfolio(weights / weights.sum(), mean, cov)
+
+
+def efficient_frontier(mean, cov, constraints=None, num_points=30):
+    """Portefeuilles de variance minimale pour des rendements cibles allant du portefeuille
+    de variance minimale au rendement maximal atteignable sous les contraintes."""
+    mean, cov = np.asarray(mean, dtype=float), np.asarray(cov, dtype=float)
+    constraints = _constraints(len(mean), constraints)
+    lowest = min_variance(mean, cov, constraints)
+
+    highest = Portfolio(_max_return_weights(mean, constraints), mean, cov)
+
+    # Chaque point part de la solution précédente, voisine de la suivante sur la frontière ;
+    # le dernier est le portefeuille de rendement maximal lui-même (un sommet, mal résolu par SLSQP)
+    frontier = [lowest]
+    for target in np.linspace(lowest.expected_return, highest.expected_return, num_points)[1:-1]:
+        target_return = {'type': 'eq', 'fun': lambda w, t=target: w @ mean - t, 'jac': lambda w: mean}
+        try:
+            weights = _solve(_variance(cov), constraints, [target_return], start=frontier[-1].weights)
+        except ValueError:
+            break
+        frontier.append(Portfolio(weights, mean, cov))
+    if num_points > 1 and highest.expected_return > lowest.expected_return:
+        frontier.append(highest)
+    return frontier
+
+
+class DiscreteAllocation:
+    """Nombre d'actions entières de chaque actif, liquidités restantes et poids réalisés."""
+
+    def __init__(self, shares, prices, budget, target):
+        self.shares = shares
+        self.prices = prices
+        self.budget = budget
+        self.amounts = shares * prices
+        self.leftover = budget - self.amounts.sum()
+        # Poids réalisés en part du budget (les liquidités restantes complètent à 1)
+        self.weights = self.amounts / budget
+        self.tracking_error = float(np.sqrt(((self.weights - target) ** 2).sum()))
+
+
+def discrete_allocation(weights, prices, budget):
+    """Convertit des poids cibles en actions entières achetables avec `budget`.
+
+    Chaque position est d'abord arrondie à l'inférieur, puis les liquidités restantes
+    achètent une à une l'action qui réduit le plus l'écart quadratique aux poids cibles,
+    tant qu'un achat est possible et réduit cet écart.
+    """
+    target = np.asarray(weights, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    shares = np.floor(target * budget / prices).astype(int)
+    shares[~np.isfinite(prices) | (prices <= 0)] = 0
+    usable = np.isfinite(prices) & (prices > 0)
+    cash = budget - (shares * prices)[usable].sum()
+    gap = (shares * np.where(usable, prices, 0.0)) / budget - target
+    step = np.where(usable, prices, np.inf) / budget
+    while True:
+        # Variation de l'écart quadratique si l'on achète une action de chaque actif
+        change = np.where(usable & (prices <= cash), (gap + step) ** 2 - gap ** 2, np.inf)
+        best = int(np.argmin(change))
+        if not change[best] < 0:
+            break
+        shares[best] += 1
+        cash -= prices[best]
+        gap[best] += step[best]
+    return DiscreteAllocation(shares, np.where(usable, prices, 0.0), budget, target)
@@ -0,0 +1,251 @@
+"""Stockage local des prix OHLCV de l'univers `data.database`.
+
+Chaque ticker est conservé dans un fichier Parquet (`store/prices/<ticker>.parquet`).
+Un rafraîchissement ne télécharge que les barres postérieures à la dernière date
+stockée ; les pages lisent ensuite directement depuis le disque.
+"""
+import os
+import logging
+import tempfile
+import threading
+
+import pandas as pd
+import yfinance as yf
+
+from data import database
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.environ.get("ALEXIA_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "store"))
+PRICES_DIR = os.path.join(STORE_DIR, "prices")
+FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# Délai minimal entre deux vérifications d'un même ticker auprès de Yahoo
+REFRESH_INTERVAL = pd.Timedelta(hours=1)
+# Nombre maximal de connexions simultanées ouvertes par yfinance lors d'un téléchargement groupé
+DOWNLOAD_THREADS = 8
+
+# Un seul rafraîchissement à la fois (planificateur et pages) : ils écrivent les mêmes fichiers
+_lock = threading.Lock()
+_last_check = {}  # ticker -> pd.Timestamp de la dernière vérification
+
+
+def universe_tickers():
+    return [entry['ticker'] for entry in database]
+
+
+def period_start(period, end=None):
+    """Convertit une période yfinance ('1mo', '1y', 'ytd', 'max', ...) en date de début."""
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+    if period is None or period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=end.year, month=1, day=1)
+    if period.endswith("mo"):
+        return end - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"):
+        return end - pd.DateOffset(years=int(period[:-1]))
+    if period.endswith("d"):
+        return end - pd.DateOffset(days=int(period[:-1]))
+    raise ValueError(f"Période non prise en charge : {period}")
+
+
+def _path(ticker):
+    return os.path.join(PRICES_DIR, f"{ticker}.parquet")
+
+
+def _normalize(df, ticker):
+    # Les versions récentes de yfinance renvoient des colonnes (Price, Ticker) même pour un seul ticker
+    if isinstance(df.columns, pd.MultiIndex):
+        if "Ticker" in df.columns.names:
+            level = df.columns.names.index("Ticker")
+        else:
+            level = next(i for i in range(df.columns.nlevels) if ticker in df.columns.get_level_values(i))
+        df = df.xs(ticker, axis=1, level=level)
+    df = df.reindex(columns=FIELDS)
+    df.columns.name = None
+    df.index = pd.to_datetime(df.index)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = "Date"
+    return df.dropna(how="all")
+
+
+def read_ticker(ticker):
+    path = _path(ticker)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=FIELDS, index=pd.DatetimeIndex([], name="Date"))
+    return pd.read_parquet(path)
+
+
+def atomic_write(path, write):
+    """Écrit `path` avec `write(f)` (fichier binaire) puis le remplace atomiquement.
+
+    Le fichier temporaire a un nom unique dans le même dossier : deux écrivains concurrents
+    ne se marchent pas dessus et un lecteur ne voit jamais un fichier partiel.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_ticker(ticker, df):
+    atomic_write(_path(ticker), lambda f: df.to_parquet(f, engine="pyarrow"))
+
+
+def last_stored_date(ticker):
+    df = read_ticker(ticker)
+    return df.index[-1] if not df.empty else None
+
+
+def stored_mtime(ticker):
+    """Date de dernière écriture du fichier d'un ticker (None s'il n'est pas stocké)."""
+    path = _path(ticker)
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def store_version(tickers=None):
+    """Identifie l'état du stockage (dernière écriture) et le jour courant : change à chaque
+    rafraîchissement et chaque jour, ce qui suffit à invalider les calculs dérivés des prix."""
+    tickers = tickers or universe_tickers()
+    mtimes = [os.path.getmtime(_path(t)) for t in tickers if os.path.exists(_path(t))]
+    return f"{max(mtimes, default=0):.0f}-{pd.Timestamp.today():%Y%m%d}"
+
+
+def _download_batch(tickers, start=None, threads=DOWNLOAD_THREADS):
+    """Télécharge plusieurs tickers en une seule requête yfinance.
+
+    Renvoie ({ticker: barres}, {ticker: erreur}) : un ticker sans données est
+    signalé comme échec au lieu d'être ignoré silencieusement.
+    """
+    period_kwargs = {"period": "max"} if start is None else {"start": start}
+    raw = yf.download(
+        tickers, group_by="ticker", auto_adjust=False, progress=False,
+        threads=threads, **period_kwargs
+    )
+    frames, failures = {}, {}
+    for ticker in tickers:
+        try:
+            df = _normalize(raw, ticker)
+        except (KeyError, StopIteration):
+            failures[ticker] = "Absent de la réponse Yahoo"
+            continue
+        if df.empty and start is None:
+            failures[ticker] = "Aucune donnée renvoyée"
+        else:
+            frames[ticker] = df
+    return frames, failures
+
+
+def _adjustment_changed(stored, fresh):
+    """Vrai si un dividende ou une division a modifié l'ajustement depuis le dernier stockage."""
+    common = stored.index.intersection(fresh.index)
+    if common.empty:
+        return False
+    day = common[-1]
+    old_ratio = stored.at[day, "Adj Close"] / stored.at[day, "Close"]
+    new_ratio = fresh.at[day, "Adj Close"] / fresh.at[day, "Close"]
+    return abs(old_ratio - new_ratio) > 1e-6 * abs(old_ratio)
+
+
+def merge_bars(stored, fresh):
+    merged = pd.concat([stored, fresh]) if not stored.empty else fresh
+    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    return merged
+
+
+def refresh(tickers=None, threads=DOWNLOAD_THREADS):
+    """Ajoute au stockage les barres postérieures à la dernière date connue de chaque ticker.
+
+    Les tickers partageant la même dernière date sont téléchargés ensemble, ce qui
+    ramène un rafraîchissement quotidien de l'univers à une seule requête. Renvoie
+    un dict {ticker: erreur} pour les échecs. `threads` borne les connexions simultanées
+    ouvertes par yfinance.
+    """
+    with _lock:
+        return _refresh(tickers, threads)
+
+
+def _refresh(tickers=None, threads=DOWNLOAD_THREADS):
+    tickers = list(tickers or universe_tickers())
+    stored = {ticker: read_ticker(ticker) for ticker in tickers}
+
+    # On recharge la dernière barre stockée pour détecter un changement d'ajustement
+    groups = {}
+    for ticker, df in stored.items():
+        groups.setdefault(df.index[-1] if not df.empty else None, []).append(ticker)
+
+    failures, reload = {}, []
+    for start, group in groups.items():
+        try:
+            frames, errors = _download_batch(group, start, threads)
+        except Exception as e:
+            frames, errors = {}, {ticker: str(e) for ticker in group}
+        failures.update(errors)
+        for ticker, fresh in frames.items():
+            if start is not None and _adjustment_changed(stored[ticker], fresh):
+                reload.append(ticker)
+            elif not fresh.empty:
+                write_ticker(ticker, merge_bars(stored[ticker], fresh))
+
+    if reload:
+        logger.info(f"Ajustement modifié pour {reload}, rechargement de l'historique complet.")
+        try:
+            frames, errors = _download_batch(reload, threads=threads)
+        except Exception as e:
+            frames, errors = {}, {ticker: str(e) for ticker in reload}
+        failures.update(errors)
+        for ticker, fresh in frames.items():
+            write_ticker(ticker, fresh)
+
+    now = pd.Timestamp.now()
+    for ticker in tickers:
+        _last_check[ticker] = now
+    for ticker, error in failures.items():
+        logger.error(f"Échec du rafraîchissement de {ticker}: {error}")
+    return failures
+
+
+def refresh_ticker(ticker):
+    failures = refresh([ticker])
+    if ticker in failures:
+        raise RuntimeError(failures[ticker])
+    return read_ticker(ticker)
+
+
+def ensure_fresh(tickers=None):
+    """Rafraîchit uniquement les tickers qui n'ont pas été vérifiés depuis REFRESH_INTERVAL."""
+    now = pd.Timestamp.now()
+    with _lock:
+        stale = [
+            ticker for ticker in (tickers or universe_tickers())
+            if ticker not in _last_check or now - _last_check[ticker] > REFRESH_INTERVAL
+        ]
+        if stale:
+            return _refresh(stale)
+    return {}
+
+
+def load_ohlcv(ticker, period="1y", start=None, end=None):
+    """Lit les barres OHLCV d'un ticker sur la période demandée."""
+    df = read_ticker(ticker)
+    start = pd.Timestamp(start) if start is not None else period_start(period, end)
+    if start is not None:
+        df = df[df.index >= start]
+    if end is not None:
+        df = df[df.index <= pd.Timestamp(end)]
+    return df
+
+
+def load_prices(tickers, period="1y", field="Adj Close", start=None, end=None):
+    """Renvoie un tableau large (dates x tickers) aligné sur l'union des dates."""
+    columns = {ticker: load_ohlcv(ticker, period, start, end)[field] for ticker in tickers}
+    return pd.DataFrame(columns, columns=list(tickers))
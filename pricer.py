@@ -1,9 +1,14 @@
 import streamlit as st
-import yfinance as yf
-import numpy as np
 import pandas as pd
 import plotly.express as px
 from data import database
+import price_store
+import portfolio
+import risk_model
+import simulation
+import backtest
+import compute_pool
+import returns_index
 
 def display_kpis_inline(df, label):
     if df.empty:
@@ -20,6 +25,14 @@ def display_kpis_inline(df, label):
                 st.markdown(f"<div style='text-align:center;'>{value}</div>", unsafe_allow_html=True)
 
 
+SIMULATION_SEED = 2024
+# Solveur de chaque profil d'investisseur (Prudent : minimiser la volatilité)
+PROFILE_SOLVERS = {
+    'Risque': portfolio.max_sharpe,
+    'Prudent': portfolio.min_variance,
+    'Optimal': portfolio.max_sharpe,
+}
+
 # Streamlit app
 st.title("Optimisation du Portefeuille")
 st.subheader("Optimisation des Investissements pour l'Année à Venir")
@@ -36,70 +49,93 @@ with col3:
     options = [stock['nom'] for stock in database]
     selected_stocks = st.multiselect("Choisissez les entreprises dans lesquelles investir:", options)
 
+# Contraintes de l'optimisation (positions uniquement acheteuses)
+col1, col2, col3 = st.columns(3)
+with col1:
+    max_weight = st.slider("Poids maximal par entreprise (%)", min_value=5, max_value=100, value=100, step=5) / 100
+with col2:
+    max_sector_weight = st.slider("Poids maximal par secteur (%)", min_value=10, max_value=100, value=100, step=5) / 100
+with col3:
+    # Estimateur du modèle de risque, précalculé pour tout l'univers
+    estimator = st.selectbox("Estimation du risque :", list(risk_model.ESTIMATORS), format_func=risk_model.ESTIMATORS.get)
+
 if budget > 0 and selected_stocks:
     with st.spinner("AlexIA optimise votre portefeuille pour une stratégie d'investissement sur 1 an..."):
         # Filtrer les tickers sélectionnés
         selected_tickers = [stock['ticker'] for stock in database if stock['nom'] in selected_stocks]
 
-        # Télécharger les données historiques
-        data = yf.download(selected_tickers, period="1y")['Adj Close']
-
-        # Calcul des rendements quotidiens
-        daily_returns = data.pct_change().dropna()
-
-        # Calcul des rendements annuels et matrice de covariance
-        annual_returns = daily_returns.mean() * 252
-        cov_matrix = daily_returns.cov() * 252
-
-        # Optimisation: Portfolio Weights
-        num_assets = len(selected_tickers)
-        num_portfolios = 10000
-        results = np.zeros((4, num_portfolios))  # Ajout d'une ligne pour le risque total
-        weights_record = []
-
-        for i in range(num_portfolios):
-            weights = np.random.random(num_assets)
-            weights /= np.sum(weights)
-            weights_record.append(weights)
-            portfolio_return = np.dot(weights, annual_returns)
-            portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-            sharpe_ratio = portfolio_return / portfolio_volatility
-            total_risk = np.dot(weights.T, np.dot(cov_matrix, weights))  # Risque total
-            results[0, i] = portfolio_return
-            results[1, i] = portfolio_volatility
-            results[2, i] = sharpe_ratio
-            results[3, i] = total_risk
-
-        # Ajustement des poids en fonction du profil d'investisseur
-        if risk_profile == "Risque":
-            max_sharpe_idx = np.argmax(results[2])
-        elif risk_profile == "Prudent":
-            max_sharpe_idx = np.argmin(results[1])  # Minimiser la volatilité
-        else:  # Optimal
-            max_sharpe_idx = np.argmax(results[2])
-
-        optimal_weights = weights_record[max_sharpe_idx]
-
-        # Calcul de la valeur du portefeuille après 1 an
-        portfolio_value_after = budget * (1 + results[0, max_sharpe_idx])
+        # Mettre à jour les données historiques
+        price_store.ensure_fresh(selected_tickers)
+
+        # Rendements annuels et matrice de covariance : extraits du modèle de l'univers
+        try:
+            annual_returns, cov_matrix = risk_model.get_model(estimator).select(selected_tickers)
+        except KeyError as e:
+            st.error(e.args[0])
+            st.stop()
+
+        # Optimisation moyenne-variance exacte sous contraintes
+        sectors = [stock['domaine'] for stock in database if stock['ticker'] in selected_tickers]
+        try:
+            constraints = portfolio.Constraints(
+                len(selected_tickers), max_weight=max_weight, sectors=sectors, max_sector_weight=max_sector_weight
+            )
+        except ValueError as e:
+            st.warning(f"{e} Les contraintes sont relâchées.")
+            constraints = portfolio.Constraints(len(selected_tickers))
+
+        # Ajustement des poids en fonction du profil d'investisseur ; en cas d'échec du solveur,
+        # repli sur la variance minimale, puis sur la répartition équipondérée
+        optimal = None
+        for solver in dict.fromkeys([PROFILE_SOLVERS[risk_profile], portfolio.min_variance]):
+            try:
+                optimal = solver(annual_returns, cov_matrix, constraints)
+                break
+            except ValueError as e:
+                st.warning(f"{e}")
+        if optimal is None:
+            st.warning("Répartition équipondérée retenue.")
+            optimal = portfolio.Portfolio([1.0 / len(selected_tickers)] * len(selected_tickers), annual_returns, cov_matrix)
+
+        optimal_weights = optimal.weights
+
+        # Actions entières achetables avec le budget aux derniers cours de clôture
+        last_prices = price_store.load_prices(selected_tickers, period="1mo", field="Close").ffill().iloc[-1]
+        allocation = portfolio.discrete_allocation(optimal_weights, last_prices.to_numpy(), budget)
+
+        # Calcul de la valeur du portefeuille après 1 an (actions entières, liquidités restantes non investies)
+        portfolio_value_after = budget + allocation.amounts @ annual_returns.to_numpy()
 
         # Valeur initiale du portefeuille
         portfolio_value_initial = budget
 
+        # Frontière efficiente calculée dans le pool de calcul pendant la simulation
+        frontier_future = compute_pool.submit(portfolio.efficient_frontier, annual_returns, cov_matrix, constraints)
+
+        # Distribution simulée de la valeur après 1 an (graine fixe : résultats stables entre ré-exécutions)
+        simulated = simulation.simulate(
+            allocation.weights, annual_returns, cov_matrix, budget,
+            step_days=simulation.CHECKPOINT_EVERY, seed=SIMULATION_SEED,
+        )
+
         # Comparaison des valeurs avant et après
         col1, col2, col3= st.columns([1, 1, 2])
 
         with col1:
             st.subheader("Performance attendue")
-            st.metric("Rendement attendu", f"{results[0, max_sharpe_idx] * 100:.2f}%", "")
-            st.metric("Risque (volatilité)", f"{results[1, max_sharpe_idx] * 100:.2f}%", "")
-            st.metric("Ratio de Sharpe", f"{results[2, max_sharpe_idx]:.2f}", "")
+            st.metric("Rendement attendu", f"{optimal.expected_return * 100:.2f}%", "")
+            st.metric("Risque (volatilité)", f"{optimal.volatility * 100:.2f}%", "")
+            st.metric("Ratio de Sharpe", f"{optimal.sharpe:.2f}", "")
         
 
         with col2:
             # Affichage de la comparaison du portefeuille
             st.subheader("Comparaison de la valeur du portefeuille")
             st.metric("Valeur du portefeuille après 1 an", f"{portfolio_value_after:.2f} CAD", f"{portfolio_value_after - portfolio_value_initial:.2f} CAD")
+            median_value = simulated.percentiles()[50]
+            st.metric("Valeur médiane simulée", f"{median_value:.2f} CAD", f"{median_value - portfolio_value_initial:.2f} CAD")
+            st.metric("Probabilité de perte", f"{simulated.probability_of_loss * 100:.1f}%")
+            st.metric(f"VaR {simulation.CONFIDENCE:.0%} / CVaR", f"{simulated.value_at_risk():.0f} / {simulated.conditional_value_at_risk():.0f} CAD")
             
         with col3:
             # Afficher la répartition optimale sous forme de camembert
@@ -111,17 +147,55 @@ if budget > 0 and selected_stocks:
             fig = px.pie(df_weights, names='Stock', values='Allocation (%)', height=300)
             st.plotly_chart(fig)
         
-        # Calcul du rendement et de la volatilité du dernier mois pour chaque action
-        last_month_returns = daily_returns.iloc[-21:]  # Prendre les 21 derniers jours
-        last_month_performance = (last_month_returns + 1).prod() - 1  # Rendement cumulé
-        
-        # Calcul de la volatilité du dernier mois pour chaque action
-        volatility_last_month = last_month_returns.std() * np.sqrt(21)  # Volatilité mensuelle
+        # Allocation en actions entières
+        st.subheader("Allocation en actions entières")
+        df_shares = pd.DataFrame({
+            'Stock': selected_tickers,
+            'Cours (CAD)': allocation.prices,
+            'Actions': allocation.shares,
+            'Montant (CAD)': allocation.amounts,
+            'Poids cible (%)': optimal_weights * 100,
+            'Poids réalisé (%)': allocation.weights * 100,
+        })
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.dataframe(df_shares.style.format({
+                'Cours (CAD)': "{:.2f}", 'Montant (CAD)': "{:.2f}", 'Poids cible (%)': "{:.2f}", 'Poids réalisé (%)': "{:.2f}",
+            }), hide_index=True, use_container_width=True)
+        with col2:
+            st.metric("Liquidités restantes", f"{allocation.leftover:.2f} CAD")
+            st.metric("Écart aux poids cibles", f"{allocation.tracking_error * 100:.2f}%")
+
+        # Éventail des valeurs simulées (percentiles) au fil de l'année
+        fan = simulated.fan()
+        df_fan = pd.DataFrame(fan.T, index=simulated.checkpoints, columns=[f"{percentile}e percentile" for percentile in simulation.PERCENTILES])
+        fig = px.line(df_fan, labels={'index': 'Jours de bourse', 'value': 'Valeur (CAD)', 'variable': ''},
+                      title=f"Distribution simulée de la valeur du portefeuille ({len(simulated.final_values):,} trajectoires)".replace(',', ' '))
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Frontière efficiente et position du portefeuille retenu
+        try:
+            frontier = compute_pool.gather([frontier_future])[0]
+        except ValueError as e:
+            frontier = None
+            st.warning(f"Frontière efficiente indisponible : {e}")
+        if frontier:
+            df_frontier = pd.DataFrame({
+                'Volatilité (%)': [point.volatility * 100 for point in frontier],
+                'Rendement attendu (%)': [point.expected_return * 100 for point in frontier],
+            })
+            fig = px.line(df_frontier, x='Volatilité (%)', y='Rendement attendu (%)', markers=True, title="Frontière efficiente")
+            fig.add_scatter(x=[optimal.volatility * 100], y=[optimal.expected_return * 100], mode='markers', marker=dict(size=14, color='red'), name=risk_profile)
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Rendement cumulé et volatilité mensuelle des 21 derniers jours : lecture dans l'index de rendements de l'univers
+        kpi_index = returns_index.get_index()
+        last_month = kpi_index.trailing(21, selected_tickers)
 
         last_month_performance_df = pd.DataFrame({
             'Stock': selected_tickers,
-            'Rendement du dernier mois (%)': last_month_performance * 100,
-            'Volatilité du dernier mois (%)': volatility_last_month * 100
+            'Rendement du dernier mois (%)': last_month['Rendement'].to_numpy() * 100,
+            'Volatilité du dernier mois (%)': last_month['Volatilité'].to_numpy() * 100
         })
 
         # Affichage des rendements en ligne
@@ -130,6 +204,38 @@ if budget > 0 and selected_stocks:
         # Affichage de la volatilité en ligne
         display_kpis_inline(last_month_performance_df[['Stock', 'Volatilité du dernier mois (%)']], "Volatilité du dernier mois")
 
+        # Rendements sur plusieurs périodes
+        st.write("### Rendement par période (%)")
+        st.dataframe((kpi_index.grid(tickers=selected_tickers) * 100).style.format("{:.2f}"), use_container_width=True)
+
+    # Backtest glissant : les mêmes allocations recalculées sur l'historique stocké
+    st.subheader("Backtest des profils")
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        frequency = st.selectbox("Rééquilibrage :", list(backtest.REBALANCE_FREQUENCIES))
+    with col2:
+        history = st.selectbox("Historique :", ["5y", "10y", "max"], index=1)
+    if st.button("Lancer le backtest"):
+        with st.spinner("AlexIA rejoue les allocations sur l'historique..."):
+            history_prices = price_store.load_prices(selected_tickers, period=history)
+            try:
+                values, table = backtest.backtest(
+                    history_prices, backtest.REBALANCE_FREQUENCIES[frequency], sectors=sectors,
+                    max_weight=max_weight, max_sector_weight=max_sector_weight,
+                )
+            except ValueError as e:
+                st.warning(str(e))
+            else:
+                fig = px.line(values, labels={'value': 'Valeur (base 100)', 'variable': 'Profil'}, title="Valeur des portefeuilles rééquilibrés")
+                st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(table.style.format("{:.0f}").format("{:.2f}", subset=backtest.PERCENT_COLUMNS), use_container_width=True)
+                if table[['Contraintes relâchées', 'Replis équipondérés']].to_numpy().any():
+                    st.caption(
+                        "Contraintes relâchées : rééquilibrages où trop peu d'actifs avaient un historique complet "
+                        "pour respecter les plafonds. Replis équipondérés : rééquilibrages où l'optimiseur n'a pas "
+                        "trouvé de solution (ex. aucun rendement attendu positif) et a gardé des poids égaux."
+                    )
+
 
 else:
     st.write("Veuillez entrer un budget et choisir des entreprises.")
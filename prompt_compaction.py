@@ -0,0 +1,101 @@
+"""Compactage des données numériques envoyées aux agents Bedrock.
+
+La taille du prompt (et donc la latence de réponse) ne doit pas dépendre de la période
+choisie : chaque série est réduite à un budget de tokens en ne gardant que les points
+les plus informatifs (début, fin, extrema, ruptures de tendance), écrits sous une forme
+numérique courte. Le nombre de tokens est estimé à un token pour CHARS_PER_TOKEN caractères.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+CHARS_PER_TOKEN = 4
+SIGNIFICANT_DIGITS = 4
+MIN_POINTS = 4
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _round_significant(value, digits):
+    if value == 0:
+        return value
+    return round(value, digits - 1 - math.floor(math.log10(abs(value))))
+
+
+def format_number(value):
+    """Écriture courte : SIGNIFICANT_DIGITS chiffres significatifs, sans notation scientifique pour les montants usuels."""
+    if value is None or pd.isna(value):
+        return "n/a"
+    value = float(value)
+    if not math.isfinite(value):
+        return str(value)
+    # Le seuil est testé sur la valeur arrondie : 9999.7 s'écrit 10k et non 1e+04
+    if abs(_round_significant(value, SIGNIFICANT_DIGITS)) >= 10 ** SIGNIFICANT_DIGITS:
+        value = _round_significant(value, SIGNIFICANT_DIGITS - 1)
+        for divisor, suffix in ((1e12, "T"), (1e9, "G"), (1e6, "M"), (1e3, "k")):
+            if abs(value) >= divisor:
+                scaled = value / divisor
+                if abs(scaled) >= 10 ** (SIGNIFICANT_DIGITS - 1):
+                    return f"{scaled:.0f}{suffix}"
+                return f"{scaled:.{SIGNIFICANT_DIGITS - 1}g}{suffix}"
+    return f"{value:.{SIGNIFICANT_DIGITS}g}"
+
+
+def _format_date(date):
+    return date.strftime(DATE_FORMAT) if hasattr(date, "strftime") else str(date)
+
+
+def key_points(series, max_points):
+    """Positions des points les plus informatifs d'une série, dans l'ordre chronologique.
+
+    On part du premier et du dernier point et des extrema, puis on ajoute tour à tour le point
+    le plus éloigné de l'interpolation linéaire des points déjà retenus (rupture de tendance).
+    """
+    y = np.asarray(series, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    x = np.arange(n)
+    selected = sorted({0, n - 1, int(y.argmin()), int(y.argmax())})[:max_points]
+    while len(selected) < max_points:
+        error = np.abs(y - np.interp(x, selected, y[selected]))
+        error[selected] = -1
+        selected = sorted(selected + [int(error.argmax())])
+    return np.array(selected)
+
+
+def encode_series(series, max_points):
+    """Ligne `date valeur` des points clés d'une série, précédée de sa variation totale."""
+    series = series.dropna()
+    if series.empty:
+        return "n/a"
+    points = series.iloc[key_points(series, max_points)]
+    change = (series.iloc[-1] / series.iloc[0] - 1) * 100 if series.iloc[0] else math.nan
+    entries = ", ".join(f"{_format_date(date)} {format_number(value)}" for date, value in points.items())
+    return f"variation {format_number(change)}% ; {entries}"
+
+
+def compact_frame(frame, token_budget, label="Secteur"):
+    """Texte des colonnes de `frame` (une série par colonne) tenant dans `token_budget` tokens."""
+    columns = [column for column in frame.columns if frame[column].notna().any()]
+    if not columns:
+        return ""
+    # Taille d'un point encodé, pour une première estimation du nombre de points par série
+    sample = f"{_format_date(frame.index[-1])} {format_number(frame[columns[0]].dropna().iloc[-1])}, "
+    overhead = sum(estimate_tokens(f"{label}: {column}\nvariation -00.00% ; \n\n") for column in columns)
+    points = max(MIN_POINTS, (token_budget - overhead) * CHARS_PER_TOKEN // (len(sample) * len(columns)))
+    while True:
+        text = "".join(f"{label}: {column}\n{encode_series(frame[column], points)}\n\n" for column in columns)
+        if estimate_tokens(text) <= token_budget or points <= MIN_POINTS:
+            return text
+        points = max(MIN_POINTS, int(points * 0.9))
+
+
+def compact_mapping(values):
+    """`clé valeur` séparés par des virgules, pour un dict ou une Series (ex. médianes par secteur)."""
+    items = values.items() if hasattr(values, "items") else values
+    return ", ".join(f"{key} {format_number(value)}" for key, value in items)
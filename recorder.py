@@ -0,0 +1,180 @@
+"""Enregistrement et rejeu hors ligne des appels externes de l'application.
+
+Les appels interceptés sont `yf.download`, `yf.Ticker.info`, `stats_can.table_to_df`,
+les requêtes HTTP faites avec `requests` (twstalker, Google) et les opérations des
+clients boto3 (Comprehend `detect_sentiment`, Bedrock `invoke_agent`, ...).
+
+Le mode se choisit avec la variable d'environnement ALEXIA_REPLAY_MODE :
+- `off` (défaut) : aucun effet ;
+- `record` : les appels sont faits normalement et leurs réponses enregistrées dans
+  ALEXIA_FIXTURES_DIR ;
+- `replay` : les réponses sont relues depuis les fixtures, sans réseau, avec une latence
+  injectée de ALEXIA_REPLAY_LATENCY secondes (± ALEXIA_REPLAY_JITTER) par appel.
+"""
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+
+# Paramètres ignorés dans la clé d'un appel car ils changent à chaque exécution
+IGNORED_PARAMS = {"sessionId"}
+
+
+class ReplayMissError(LookupError):
+    """Aucun enregistrement ne correspond à l'appel demandé en mode rejeu."""
+
+
+class Recorder:
+    """Enregistre ou rejoue les réponses d'appels identifiés par un nom et des arguments."""
+
+    def __init__(self, mode, fixtures_dir, latency=0.0, jitter=0.0, seed=0):
+        if mode not in MODES:
+            raise ValueError(f"Mode inconnu '{mode}'. Veuillez choisir parmi {MODES}.")
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._local = threading.local()
+
+    def _path(self, name, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.fixtures_dir, name, f"{digest}.pkl")
+
+    def _sleep(self):
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def call(self, name, key, func, *args, **kwargs):
+        # Les appels imbriqués (ex. requests utilisé par stats_can) ne sont pas enregistrés séparément
+        if self.mode == "off" or getattr(self._local, "active", False):
+            return func(*args, **kwargs)
+
+        path = self._path(name, key)
+        if self.mode == "replay":
+            if not os.path.exists(path):
+                raise ReplayMissError(f"Aucun enregistrement pour {name} {key!r}")
+            with open(path, "rb") as f:
+                response = pickle.load(f)
+            self._sleep()
+            return response
+
+        self._local.active = True
+        try:
+            response = func(*args, **kwargs)
+        finally:
+            self._local.active = False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(response, f)
+        os.replace(tmp_path, path)
+        return response
+
+
+_recorder = None
+_originals = {}
+
+
+def _patch(owner, attribute, make_wrapper):
+    original = _originals.setdefault((owner, attribute), getattr(owner, attribute))
+    setattr(owner, attribute, make_wrapper(original))
+
+
+def _wrap_yf_download(original):
+    @functools.wraps(original)
+    def download(tickers, *args, **kwargs):
+        key = (tickers, args, sorted(kwargs.items()))
+        return _recorder.call("yf.download", key, original, tickers, *args, **kwargs)
+    return download
+
+
+def _wrap_ticker_info(original):
+    def info(self):
+        return _recorder.call("yf.Ticker.info", self.ticker, original.fget, self)
+    return property(info)
+
+
+def _wrap_table_to_df(original):
+    @functools.wraps(original)
+    def table_to_df(table, *args, **kwargs):
+        key = (table, args, sorted(kwargs.items()))
+        return _recorder.call("stats_can.table_to_df", key, original, table, *args, **kwargs)
+    return table_to_df
+
+
+def _wrap_session_request(original):
+    @functools.wraps(original)
+    def request(self, method, url, *args, **kwargs):
+        key = (method.upper(), url, args, kwargs.get("params"), kwargs.get("data"))
+        return _recorder.call("requests", key, original, self, method, url, *args, **kwargs)
+    return request
+
+
+def _materialize(response):
+    # Les flux d'évènements (ex. `completion` de invoke_agent) ne se lisent qu'une fois et ne se sérialisent pas
+    materialized = dict(response)
+    for field, value in response.items():
+        if hasattr(value, "__iter__") and not isinstance(value, (dict, list, str, bytes)):
+            materialized[field] = list(value)
+    return materialized
+
+
+def _wrap_make_api_call(original):
+    @functools.wraps(original)
+    def _make_api_call(self, operation_name, api_params):
+        service = self.meta.service_model.service_name
+        params = {k: v for k, v in api_params.items() if k not in IGNORED_PARAMS}
+        key = (service, operation_name, sorted(params.items()))
+        return _recorder.call(
+            f"boto3.{service}", key, lambda: _materialize(original(self, operation_name, api_params))
+        )
+    return _make_api_call
+
+
+def install(mode=None, fixtures_dir=None, latency=None, jitter=None):
+    """Active l'enregistrement ou le rejeu ; sans argument, la configuration vient de l'environnement."""
+    global _recorder
+    mode = mode or os.environ.get("ALEXIA_REPLAY_MODE", "off")
+    if mode == "off" and _recorder is None:
+        return None
+    fixtures_dir = fixtures_dir or os.environ.get(
+        "ALEXIA_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+    )
+    latency = float(os.environ.get("ALEXIA_REPLAY_LATENCY", 0.0)) if latency is None else latency
+    jitter = float(os.environ.get("ALEXIA_REPLAY_JITTER", 0.0)) if jitter is None else jitter
+    # app.py appelle install() à chaque ré-exécution : on garde le recorder existant s'il est identique
+    if _recorder is not None and (_recorder.mode, _recorder.fixtures_dir, _recorder.latency, _recorder.jitter) == (mode, fixtures_dir, latency, jitter):
+        return _recorder
+    _recorder = Recorder(mode, fixtures_dir, latency, jitter)
+
+    import botocore.client
+    import requests
+    import stats_can
+    import yfinance as yf
+
+    _patch(yf, "download", _wrap_yf_download)
+    _patch(yf.Ticker, "info", _wrap_ticker_info)
+    _patch(stats_can, "table_to_df", _wrap_table_to_df)
+    _patch(requests.Session, "request", _wrap_session_request)
+    _patch(botocore.client.BaseClient, "_make_api_call", _wrap_make_api_call)
+    logger.info(f"Recorder actif en mode '{mode}' ({fixtures_dir})")
+    return _recorder
+
+
+def uninstall():
+    """Restaure les fonctions d'origine."""
+    global _recorder
+    for (owner, attribute), original in _originals.items():
+        setattr(owner, attribute, original)
+    _originals.clear()
+    _recorder = None
@@ -0,0 +1,102 @@
+"""Index de rendements par sommes cumulées, pour les KPIs de performance sur plusieurs fenêtres.
+
+Pour chaque ticker, on garde les sommes cumulées des log-rendements, des rendements
+simples et de leurs carrés, ainsi que le nombre de rendements. Le rendement et la
+volatilité sur n'importe quelle fenêtre (1 semaine, 1 mois, depuis janvier, dates
+libres...) sont alors des différences de deux lignes, calculées pour tout l'univers d'un coup.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import price_store
+
+# Fenêtres glissantes affichées dans les grilles de KPIs : libellé -> période `price_store.period_start`
+WINDOWS = {
+    '1 sem.': '7d',
+    '1 mois': '1mo',
+    '3 mois': '3mo',
+    'Depuis janvier': 'ytd',
+    '1 an': '1y',
+}
+
+
+class ReturnsIndex:
+    """Sommes cumulées des rendements d'un tableau large de prix (dates x tickers)."""
+
+    def __init__(self, prices, version=None):
+        self.index = prices.index
+        self.tickers = list(prices.columns)
+        self.version = version
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+        # Les trous sont comblés par le dernier cours : aucun mouvement de prix n'est perdu
+        returns = prices.ffill().pct_change(fill_method=None).to_numpy(dtype=float)
+        valid = ~np.isnan(returns)
+        simple = np.where(valid, returns, 0.0)
+        self.log = np.cumsum(np.log1p(simple), axis=0)
+        self.sum = np.cumsum(simple, axis=0)
+        self.sum_sq = np.cumsum(simple ** 2, axis=0)
+        self.count = np.cumsum(valid, axis=0)
+
+    def _columns(self, tickers):
+        if tickers is None:
+            return slice(None), self.tickers
+        return [self._positions[ticker] for ticker in tickers], list(tickers)
+
+    def _row(self, date):
+        """Dernière ligne à la date `date` ou avant (0 si la date précède l'historique)."""
+        return max(int(self.index.searchsorted(pd.Timestamp(date), side='right')) - 1, 0)
+
+    def between_rows(self, start, end, tickers=None):
+        """Rendement et volatilité des rendements des lignes start+1 à end (incluses)."""
+        columns, names = self._columns(tickers)
+        n = (self.count[end] - self.count[start])[columns]
+        total = (self.sum[end] - self.sum[start])[columns]
+        total_sq = (self.sum_sq[end] - self.sum_sq[start])[columns]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (total_sq - total ** 2 / n) / (n - 1)
+            volatility = np.sqrt(np.clip(variance, 0.0, None) * n)
+        performance = np.expm1((self.log[end] - self.log[start])[columns])
+        return pd.DataFrame({
+            'Rendement': np.where(n > 0, performance, np.nan),
+            'Volatilité': np.where(n > 1, volatility, np.nan),
+        }, index=names)
+
+    def window(self, start=None, end=None, tickers=None):
+        """KPIs entre deux dates (depuis le début de l'historique et jusqu'à la fin par défaut).
+
+        La volatilité est celle de la fenêtre : écart-type des rendements quotidiens fois
+        la racine du nombre de jours.
+        """
+        end_row = self._row(end) if end is not None else len(self.index) - 1
+        start_row = self._row(start) if start is not None else 0
+        return self.between_rows(start_row, end_row, tickers)
+
+    def trailing(self, days, tickers=None):
+        """KPIs des `days` derniers rendements quotidiens."""
+        end_row = len(self.index) - 1
+        return self.between_rows(max(end_row - days, 0), end_row, tickers)
+
+    def period(self, period, tickers=None):
+        """KPIs sur une période ('7d', '1mo', 'ytd', '1y', ...) se terminant à la dernière date."""
+        return self.window(price_store.period_start(period, end=self.index[-1]), tickers=tickers)
+
+    def grid(self, windows=WINDOWS, tickers=None, field='Rendement'):
+        """Tableau tickers x fenêtres d'un KPI."""
+        return pd.DataFrame({label: self.period(period, tickers)[field] for label, period in windows.items()})
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Index de l'univers sur tout l'historique stocké, reconstruit quand le stockage change."""
+    global _index
+    version = price_store.store_version()
+    with _lock:
+        if _index is None or _index.version != version:
+            prices = price_store.load_prices(price_store.universe_tickers(), period="max")
+            _index = ReturnsIndex(prices, version)
+        return _index
@@ -0,0 +1,182 @@
+"""Rendements moyens et covariance annualisés de tout l'univers `data.database`.
+
+Le modèle est estimé une fois par rafraîchissement des prix, pour tous les tickers,
+puis conservé sur disque (`store/risk/<estimateur>.npz`) et en mémoire. Une sélection
+d'entreprises n'est plus qu'une extraction de sous-vecteur et de sous-matrice.
+
+Estimateurs proposés : covariance historique, rétrécissement de Ledoit-Wolf vers une
+matrice identité mise à l'échelle (forme fermée, identique à `sklearn.covariance.LedoitWolf`)
+et moyenne exponentiellement pondérée (EWMA).
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import price_store
+
+logger = logging.getLogger(__name__)
+
+RISK_DIR = os.path.join(price_store.STORE_DIR, "risk")
+LOOKBACK_PERIOD = "1y"
+TRADING_DAYS = 252
+# Tickers écartés du modèle s'ils ont moins de rendements que cela sur la période
+MIN_OBSERVATIONS = 60
+EWMA_HALFLIFE = 63
+
+ESTIMATORS = {
+    'sample': "Historique",
+    'ledoit_wolf': "Ledoit-Wolf",
+    'ewma': "Exponentielle (EWMA)",
+}
+
+
+def sample_covariance(returns):
+    """Covariance historique, calculée sur les paires de dates communes à chaque couple de tickers.
+
+    Avec des historiques de longueurs différentes, la matrice obtenue peut ne pas être
+    semi-définie positive : `build` la projette sur les matrices semi-définies positives.
+    Deux tickers sans dates communes ont une covariance nulle.
+    """
+    return np.nan_to_num(returns.cov().to_numpy())
+
+
+def nearest_psd(cov):
+    """Matrice symétrique semi-définie positive la plus proche : valeurs propres négatives ramenées à 0.
+
+    Seul l'arrondi peut laisser des valeurs propres de l'ordre de -1e-16, que `Portfolio` ramène à 0.
+    """
+    cov = (cov + cov.T) / 2
+    values, vectors = np.linalg.eigh(cov)
+    if values.min() >= 0:
+        return cov
+    return (vectors * np.clip(values, 0.0, None)) @ vectors.T
+
+
+def ledoit_wolf(returns):
+    """Covariance rétrécie de Ledoit-Wolf (2004) ; les rendements manquants valent la moyenne."""
+    x = (returns - returns.mean()).fillna(0.0).to_numpy()
+    n, p = x.shape
+    emp_cov = x.T @ x / n
+    x2 = x ** 2
+    mu = np.trace(emp_cov) / p
+    delta_ = np.sum(emp_cov ** 2)
+    beta = (np.sum(x2.T @ x2) / n - delta_) / (p * n)
+    delta = (delta_ - 2.0 * mu * np.trace(emp_cov) + p * mu ** 2) / p
+    shrinkage = 0.0 if beta == 0 else min(beta, delta) / delta
+    return (1.0 - shrinkage) * emp_cov + shrinkage * mu * np.eye(p)
+
+
+def ewma_covariance(returns, halflife=EWMA_HALFLIFE):
+    """Covariance à pondération exponentielle : les rendements récents comptent davantage."""
+    x = (returns - returns.mean()).fillna(0.0).to_numpy()
+    weights = 0.5 ** (np.arange(len(x))[::-1] / halflife)
+    weights /= weights.sum()
+    return (x * weights[:, None]).T @ x
+
+
+ESTIMATOR_FUNCTIONS = {
+    'sample': sample_covariance,
+    'ledoit_wolf': ledoit_wolf,
+    'ewma': ewma_covariance,
+}
+
+
+class RiskModel:
+    """Rendements moyens et covariance annualisés d'un ensemble de tickers."""
+
+    def __init__(self, tickers, mean, cov, estimator, version):
+        self.tickers = list(tickers)
+        self.mean = np.asarray(mean, dtype=float)
+        self.cov = np.asarray(cov, dtype=float)
+        self.estimator = estimator
+        self.version = version
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def select(self, tickers):
+        """Renvoie (Series des rendements annuels, DataFrame de covariance) pour les tickers demandés."""
+        missing = [ticker for ticker in tickers if ticker not in self._positions]
+        if missing:
+            raise KeyError(f"Historique insuffisant pour : {', '.join(missing)}")
+        positions = [self._positions[ticker] for ticker in tickers]
+        mean = pd.Series(self.mean[positions], index=tickers)
+        cov = pd.DataFrame(self.cov[np.ix_(positions, positions)], index=tickers, columns=tickers)
+        return mean, cov
+
+
+def build(estimator='sample', tickers=None, period=LOOKBACK_PERIOD):
+    """Estime le modèle de risque de l'univers à partir des prix ajustés stockés."""
+    tickers = tickers or price_store.universe_tickers()
+    version = price_store.store_version(tickers)
+    prices = price_store.load_prices(tickers, period=period)
+    returns = prices.pct_change(fill_method=None).dropna(how='all')
+    returns = returns.loc[:, returns.count() >= MIN_OBSERVATIONS]
+    cov = nearest_psd(ESTIMATOR_FUNCTIONS[estimator](returns)) * TRADING_DAYS
+    return RiskModel(returns.columns, returns.mean().to_numpy() * TRADING_DAYS, cov, estimator, version)
+
+
+def _path(estimator):
+    return os.path.join(RISK_DIR, f"{estimator}.npz")
+
+
+def save(model):
+    price_store.atomic_write(_path(model.estimator), lambda f: np.savez(
+        f, tickers=np.array(model.tickers), mean=model.mean, cov=model.cov, version=model.version
+    ))
+
+
+def load(estimator):
+    path = _path(estimator)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return RiskModel(data['tickers'].tolist(), data['mean'], data['cov'], estimator, str(data['version']))
+
+
+_models = {}
+_lock = threading.Lock()
+# Une seule estimation à la fois (planificateur et pages) : pas de calcul ni d'écriture en double
+_build_lock = threading.Lock()
+
+
+def _refresh(estimator):
+    model = build(estimator)
+    save(model)
+    with _lock:
+        _models[estimator] = model
+    return model
+
+
+def refresh(estimator='sample'):
+    """Réestime et enregistre le modèle d'un estimateur."""
+    with _build_lock:
+        return _refresh(estimator)
+
+
+def refresh_all():
+    for estimator in ESTIMATORS:
+        refresh(estimator)
+
+
+def get_model(estimator='sample'):
+    """Modèle à jour pour l'état actuel du stockage des prix : mémoire, puis disque, sinon réestimé."""
+    version = price_store.store_version()
+    with _lock:
+        model = _models.get(estimator)
+    if model is not None and model.version == version:
+        return model
+    model = load(estimator)
+    if model is not None and model.version == version:
+        with _lock:
+            _models[estimator] = model
+        return model
+    with _build_lock:
+        # Le planificateur a pu réestimer le modèle pendant l'attente du verrou
+        with _lock:
+            model = _models.get(estimator)
+        if model is not None and model.version == version:
+            return model
+        logger.info(f"Réestimation du modèle de risque '{estimator}' (version {version})")
+        return _refresh(estimator)
@@ -0,0 +1,165 @@
+"""Rafraîchissement en arrière-plan des données de l'univers `data.database`.
+
+Un thread unique par processus Streamlit met à jour les prix, les instantanés `info`
+et les séries Statistique Canada selon un intervalle propre à chaque jeu de données,
+ainsi que juste après la clôture de la Bourse de Toronto. Les pages ne lisent donc
+que des données déjà chaudes.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import fundamentals
+import indicator_state
+import macro_store
+import price_store
+import risk_model
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo("America/Toronto")
+# Clôture du TSX (16h00) plus une marge pour la publication des barres du jour
+MARKET_CLOSE = time(16, 15)
+POLL_SECONDS = 60
+# Threads des rafraîchissements : connexions yfinance du téléchargement des prix, appels
+# `info` des fondamentaux et jeux de données rafraîchis en parallèle
+MAX_WORKERS = int(os.environ.get("ALEXIA_REFRESH_WORKERS", 4))
+
+
+def refresh_prices(workers):
+    # Les points de reprise des indicateurs n'intègrent que les barres qui viennent d'arriver
+    failures = price_store.refresh(threads=workers)
+    indicator_state.update_universe([t for t in price_store.universe_tickers() if t not in failures])
+    # Modèles de risque de l'univers réestimés une fois par rafraîchissement
+    risk_model.refresh_all()
+    return failures
+
+
+DATASETS = {
+    'prices': {
+        'label': "Prix",
+        'job': refresh_prices,
+        'interval': timedelta(hours=1),
+        'after_close': True,
+    },
+    'fundamentals': {
+        'label': "Fondamentaux",
+        'job': lambda workers: fundamentals.warm(max_workers=workers),
+        # Plus court que le TTL du cache pour que les pages ne tombent jamais sur une entrée expirée
+        'interval': timedelta(seconds=fundamentals.INFO_TTL / 2),
+        'after_close': True,
+    },
+    'macro': {
+        'label': "Statistique Canada",
+        'job': lambda workers: macro_store.refresh_all(),
+        'interval': timedelta(hours=1),
+        'after_close': False,
+    },
+}
+
+
+def last_market_close(now):
+    """Dernière clôture (jour ouvré) antérieure ou égale à `now`."""
+    close = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TZ)
+    if close > now:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+
+class RefreshScheduler:
+    """Exécute périodiquement les rafraîchissements et garde leur état pour l'affichage."""
+
+    def __init__(self, datasets=DATASETS, max_workers=MAX_WORKERS, poll_seconds=POLL_SECONDS):
+        self.datasets = datasets
+        self.max_workers = max_workers
+        self.poll_seconds = poll_seconds
+        self._status = {
+            name: {'label': spec['label'], 'last_refresh': None, 'duration': None, 'failures': {}, 'error': None, 'running': False}
+            for name, spec in datasets.items()
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_due(self, name, now):
+        spec = self.datasets[name]
+        with self._lock:
+            state = self._status[name]
+            last = state['last_refresh']
+            if state['running']:
+                return False
+        if last is None or now - last >= spec['interval']:
+            return True
+        return spec['after_close'] and last < last_market_close(now) <= now
+
+    def _run(self, name):
+        with self._lock:
+            self._status[name]['running'] = True
+        started = datetime.now(MARKET_TZ)
+        failures, error = {}, None
+        try:
+            failures = self.datasets[name]['job'](self.max_workers) or {}
+        except Exception as e:
+            logger.error(f"Échec du rafraîchissement planifié '{name}': {e}")
+            error = str(e)
+        with self._lock:
+            self._status[name].update(
+                last_refresh=started,
+                duration=(datetime.now(MARKET_TZ) - started).total_seconds(),
+                failures=failures,
+                error=error,
+                running=False,
+            )
+
+    def run_now(self, names=None):
+        """Rafraîchit immédiatement les jeux de données demandés, en parallèle."""
+        names = list(names or self.datasets)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(self._run, names))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = datetime.now(MARKET_TZ)
+            due = [name for name in self.datasets if self.is_due(name, now)]
+            if due:
+                self.run_now(due)
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="alexia-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            return {name: dict(state) for name, state in self._status.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RefreshScheduler()
+        return _scheduler
+
+
+def start():
+    """Démarre le planificateur une seule fois par processus (désactivable avec ALEXIA_SCHEDULER=off)."""
+    if os.environ.get("ALEXIA_SCHEDULER", "on") == "off":
+        return None
+    scheduler = get_scheduler()
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,114 @@
+"""Couche de récupération des pages web (twstalker, Google) partagée par toutes les pages.
+
+Les requêtes passent par une seule `requests.Session` : les connexions keep-alive et TLS
+sont réutilisées d'un appel à l'autre. Chaque requête a un délai maximal, les erreurs
+temporaires (connexion, 429, 5xx) sont réessayées avec une attente croissante, et un
+seau à jetons par hôte limite le débit envoyé à chaque site.
+
+`fetch_many` télécharge plusieurs pages en parallèle sur un pool borné de threads (les
+threads attendent le réseau sans retenir le GIL) : une comparaison de tout un secteur
+dure à peu près le temps de la page la plus lente.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.environ.get("ALEXIA_SCRAPE_WORKERS", 16))
+# Délais (secondes) d'établissement de la connexion et de lecture de la réponse
+TIMEOUT = (5, 20)
+RETRIES = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET", "HEAD"),
+    respect_retry_after_header=True,
+    # Après le dernier essai, la dernière réponse est renvoyée telle quelle
+    raise_on_status=False,
+)
+# Débit par hôte : RATE_PER_SECOND requêtes par seconde en régime établi, rafales de RATE_BURST
+RATE_PER_SECOND = float(os.environ.get("ALEXIA_SCRAPE_RATE", 4.0))
+RATE_BURST = 10
+
+
+class RateLimiter:
+    """Seau à jetons par hôte : `acquire` attend qu'un jeton soit disponible pour l'hôte."""
+
+    def __init__(self, rate=RATE_PER_SECOND, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # hôte -> (jetons, instant de la dernière mise à jour)
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            # Le jeton est réservé tout de suite ; s'il manque, on attend qu'il se régénère
+            tokens -= 1
+            self._buckets[host] = (tokens, now)
+        if tokens < 0:
+            time.sleep(-tokens / self.rate)
+
+
+_session = None
+_executor = None
+_limiter = RateLimiter()
+_lock = threading.Lock()
+
+
+def get_session():
+    """Session HTTP partagée, créée au premier besoin."""
+    global _session
+    with _lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS, max_retries=RETRIES)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="scraping")
+        return _executor
+
+
+def fetch(url, **kwargs):
+    """GET de `url` sur la session partagée, sous la limite de débit de son hôte."""
+    kwargs.setdefault("timeout", TIMEOUT)
+    _limiter.acquire(urlsplit(url).netloc)
+    start = time.perf_counter()
+    response = get_session().get(url, **kwargs)
+    logger.debug(f"GET {url} -> {response.status_code} en {time.perf_counter() - start:.2f} s")
+    return response
+
+
+def fetch_many(urls, **kwargs):
+    """Télécharge les `urls` en parallèle ; renvoie les réponses dans l'ordre. Une erreur est relancée ici."""
+    return run_many(lambda url: fetch(url, **kwargs), urls)
+
+
+def run_many(func, items):
+    """Exécute `func` sur chaque élément dans le pool de threads (appels réseau) ; résultats dans l'ordre."""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    futures = [_get_executor().submit(func, item) for item in items]
+    try:
+        return [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
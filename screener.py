@@ -0,0 +1,166 @@
+"""Screener technique de l'univers : signaux RSI, MACD, OBV et Bollinger pour chaque ticker.
+
+Les signaux sont lus dans les points de reprise de `indicator_state`, tenus à jour barre
+par barre après chaque rafraîchissement des prix : rien n'est recalculé sur l'historique.
+Un point de reprise plus ancien que le fichier de prix de son ticker n'intègre que les
+nouvelles barres. Les points de reprise sont lus en parallèle, puis les signaux de tous les
+tickers sont évalués d'un coup sur des tableaux (fenêtre récente x tickers).
+
+Les tickers sans point de reprise (premier lancement, nouvelle version des points de reprise)
+ne sont pas reconstruits ici barre par barre : leurs signaux sont calculés sur des panneaux
+larges (dates x tickers) de HISTORY_PERIOD. Au-delà de PARALLEL_THRESHOLD tickers, les colonnes
+sont réparties en blocs évalués en parallèle sur le pool de calcul partagé (`compute_pool`).
+Le planificateur construit leurs points de reprise après le prochain rafraîchissement des prix.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import compute_pool
+import indicator_state
+import indicators
+import price_store
+from data import database
+from indicators import CROSS_LOOKBACK, OBV_TREND_WINDOW
+
+# Historique des panneaux, pour que les EMA du MACD soient stabilisées sur la dernière barre
+HISTORY_PERIOD = "1y"
+RSI_OVERSOLD, RSI_OVERBOUGHT = 30, 70
+
+PARALLEL_THRESHOLD = 200
+CHUNK_SIZE = 250
+READ_WORKERS = 16
+
+COLUMNS = ['RSI', 'MACD', 'Croisement MACD', 'Tendance OBV', '%B Bollinger', 'Bollinger', 'Signal RSI', 'Score']
+
+
+def _obv_slope(obv, volume):
+    """Pente de l'OBV sur OBV_TREND_WINDOW barres, rapportée au volume moyen (régression linéaire)."""
+    window = obv[-OBV_TREND_WINDOW:]
+    t = np.arange(len(window), dtype=float)
+    t -= t.mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.nansum(t[:, None] * (window - np.nanmean(window, axis=0)), axis=0) / (t ** 2).sum()
+        return slope / np.nanmean(volume[-OBV_TREND_WINDOW:], axis=0)
+
+
+def _recent(states, attribute, length):
+    """Tableau (length x tickers) des dernières valeurs gardées ; les historiques plus courts sont complétés par NaN."""
+    result = np.full((length, len(states)), np.nan)
+    for j, state in enumerate(states):
+        values = list(getattr(state, attribute))
+        if values:
+            result[length - len(values):, j] = values
+    return result
+
+
+def _signals(tickers, rsi, macd, last_close, upper, lower, spread, obv_slope):
+    """Tableau des signaux à partir des dernières valeurs (une par ticker) et des écarts MACD récents."""
+    spread = np.sign(spread)
+    recent = spread[:-1]
+    crossed_up = (spread[-1] > 0) & (recent <= 0).any(axis=0)
+    crossed_down = (spread[-1] < 0) & (recent >= 0).any(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percent_b = (last_close - lower) / (upper - lower)
+
+    result = pd.DataFrame({
+        'RSI': rsi,
+        'MACD': macd,
+        'Croisement MACD': np.select([crossed_up, crossed_down], ['Haussier', 'Baissier'], ''),
+        'Tendance OBV': np.select([obv_slope > 0, obv_slope < 0], ['Hausse', 'Baisse'], ''),
+        '%B Bollinger': percent_b,
+        'Bollinger': np.select([last_close > upper, last_close < lower], ['Au-dessus', 'En dessous'], 'Dans les bandes'),
+    }, index=tickers)
+    result['Signal RSI'] = np.select(
+        [result['RSI'] < RSI_OVERSOLD, result['RSI'] > RSI_OVERBOUGHT], ['Survendu', 'Suracheté'], 'Neutre'
+    )
+    # Score haussier : survente, croisement haussier, OBV en hausse, cassure de la bande basse
+    result['Score'] = (
+        (result['Signal RSI'] == 'Survendu').astype(int) - (result['Signal RSI'] == 'Suracheté').astype(int)
+        + crossed_up.astype(int) - crossed_down.astype(int)
+        + np.sign(np.nan_to_num(obv_slope)).astype(int)
+        + (result['Bollinger'] == 'En dessous').astype(int) - (result['Bollinger'] == 'Au-dessus').astype(int)
+    )
+    return result
+
+
+def screen_states(states):
+    """Calcule les signaux à partir des points de reprise {ticker: TickerIndicators} ; DataFrame indexé par ticker."""
+    if not states:
+        return pd.DataFrame(columns=COLUMNS)
+    tickers = list(states)
+    states = list(states.values())
+    values = pd.DataFrame([state.values() for state in states], index=tickers)
+    return _signals(
+        tickers,
+        values['RSI'].to_numpy(),
+        values['MACD'].to_numpy() - values['Signal_Line'].to_numpy(),
+        np.array([state.last_close for state in states], dtype=float),
+        values['Upper Band'].to_numpy(),
+        values['Lower Band'].to_numpy(),
+        _recent(states, 'spreads', CROSS_LOOKBACK + 1),
+        _obv_slope(_recent(states, 'recent_obv', OBV_TREND_WINDOW), _recent(states, 'recent_volumes', OBV_TREND_WINDOW)),
+    )
+
+
+def screen_panel(close, volume):
+    """Calcule les signaux de tous les tickers d'un panneau (dates x tickers) ; DataFrame indexé par ticker."""
+    panel = indicators.IndicatorPanel(close, volume)
+    line, signal = panel['MACD'].to_numpy(), panel['Signal_Line'].to_numpy()
+    return _signals(
+        close.columns,
+        panel['RSI'].to_numpy()[-1],
+        line[-1] - signal[-1],
+        close.ffill().to_numpy()[-1],
+        panel['Upper Band'].to_numpy()[-1],
+        panel['Lower Band'].to_numpy()[-1],
+        (line - signal)[-CROSS_LOOKBACK - 1:],
+        _obv_slope(panel['OBV'].to_numpy(), volume.reindex_like(close).to_numpy(dtype=float)),
+    )
+
+
+def load_states(tickers):
+    """Points de reprise existants des tickers, lus en parallèle ; renvoie ({ticker: état}, tickers sans point de reprise)."""
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        states = dict(zip(tickers, pool.map(indicator_state.cached_state, tickers)))
+    cold = [ticker for ticker, state in states.items() if state is None]
+    return {ticker: state for ticker, state in states.items() if state is not None}, cold
+
+
+def load_panels(tickers, period=HISTORY_PERIOD):
+    """Lit Close et Volume des tickers depuis le stockage local, fichiers lus en parallèle."""
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        frames = dict(zip(tickers, pool.map(lambda t: price_store.load_ohlcv(t, period=period), tickers)))
+    close = pd.DataFrame({t: df['Close'] for t, df in frames.items()}, columns=list(tickers))
+    volume = pd.DataFrame({t: df['Volume'] for t, df in frames.items()}, columns=list(tickers))
+    return close, volume
+
+
+def screen_cold(tickers, period=HISTORY_PERIOD):
+    """Signaux des tickers sans point de reprise, calculés sur des panneaux ; en blocs sur le pool au-delà du seuil."""
+    if not tickers:
+        return pd.DataFrame(columns=COLUMNS)
+    close, volume = load_panels(tickers, period)
+    close = close.dropna(axis=1, how='all')
+    volume = volume[close.columns]
+    if close.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    if close.shape[1] < PARALLEL_THRESHOLD:
+        return screen_panel(close, volume)
+    chunks = [close.columns[i:i + CHUNK_SIZE] for i in range(0, close.shape[1], CHUNK_SIZE)]
+    return pd.concat(compute_pool.run_many(screen_panel, [close[c] for c in chunks], [volume[c] for c in chunks]))
+
+
+def screen(tickers=None):
+    """Évalue les signaux de l'univers et renvoie le tableau classé par score décroissant."""
+    tickers = list(tickers or price_store.universe_tickers())
+    states, cold = load_states(tickers)
+    parts = [part for part in (screen_states(states), screen_cold(cold)) if not part.empty]
+    result = pd.concat(parts) if parts else pd.DataFrame(columns=COLUMNS)
+
+    names = {entry['ticker']: (entry['nom'], entry['domaine']) for entry in database}
+    result.insert(0, 'Entreprise', [names.get(t, (t, ''))[0] for t in result.index])
+    result.insert(1, 'Secteur', [names.get(t, ('', ''))[1] for t in result.index])
+    result.index.name = 'Ticker'
+    return result.sort_values(['Score', 'RSI'], ascending=[False, True])
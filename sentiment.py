@@ -1,15 +1,24 @@
+import logging
+
 import streamlit as st
 import pandas as pd
 import yfinance as yf
-import requests
 from bs4 import BeautifulSoup
-import boto3
+import aws_clients
 import plotly.graph_objects as go
 import numpy as np
 
+import scraping
 from data import database
 
-comprehend = boto3.client('comprehend', region_name='us-west-2')
+logger = logging.getLogger(__name__)
+
+comprehend = aws_clients.get_client('comprehend')
+
+NB_TWEETS = 30
+SENTIMENTS = ('POSITIVE', 'NEGATIVE', 'NEUTRAL', 'MIXED')
+# Nombre maximal de textes par appel `batch_detect_sentiment`
+COMPREHEND_BATCH_SIZE = 25
 
 
 def entreprise_vs_clients(nom):
@@ -20,41 +29,19 @@ def entreprise_vs_clients(nom):
     cursor_positions = []
     labels = ["clients", nom]
 
-    for type in labels:
-        positive_tweets = 0
-        negative_tweets = 0
-        neutral_tweets = 0
-        mixed_tweets = 0
-
-        if type == nom:
-            URL = f"https://twstalker.com/{nom}"
-        else:
-            URL = f"https://twstalker.com/search/{nom}"
-
-        page = requests.get(URL)
-        soup = BeautifulSoup(page.content, "html.parser")
-        tweets = []
-        job_elements = soup.find_all("p")
-        nb_tweets = 30
+    urls = [f"https://twstalker.com/search/{nom}", f"https://twstalker.com/{nom}"]
+    # Les deux pages sont téléchargées puis classées en parallèle
+    tweet_lists = [parse_tweets(page) for page in scraping.fetch_many(urls)]
+    all_counts = scraping.run_many(count_sentiments, tweet_lists)
 
-        for i, job_element in enumerate(job_elements[:nb_tweets]):
-            element = job_element.text
-            tweets.append(element)
+    for type, counts in zip(labels, all_counts):
+        positive_tweets = counts['POSITIVE']
+        negative_tweets = counts['NEGATIVE']
+        neutral_tweets = counts['NEUTRAL']
+        mixed_tweets = counts['MIXED']
 
-        tweets = tweets[1:]  # Supprimer le premier élément qui cause un bug
-
-        for tweet in tweets:
-            sentiment = classify_sentiment_comprehend(tweet)
-            if sentiment == 'POSITIVE':
-                positive_tweets += 1
-            elif sentiment == 'NEGATIVE':
-                negative_tweets += 1
-            elif sentiment == 'NEUTRAL':
-                neutral_tweets += 1
-            elif sentiment == 'MIXED':
-                mixed_tweets += 1
-
-        total_tweets = len(tweets)
+        # Seuls les tweets effectivement classés par Comprehend comptent dans les taux
+        total_tweets = sum(counts.values())
 
         if total_tweets > 0:
             positive_ratio = positive_tweets / total_tweets
@@ -106,53 +93,45 @@ def entreprise_vs_clients(nom):
 def get_sectors_from_db(database):
     return {domaine: [(entry['ticker'], entry['nom']) for entry in database if entry['domaine'] == domaine] for domaine in set(entry['domaine'] for entry in database)}
 
-def classify_sentiment_comprehend(tweet):
-    response = comprehend.detect_sentiment(Text=tweet, LanguageCode='en')
-    return response['Sentiment']
+def parse_tweets(page):
+    soup = BeautifulSoup(page.content, "html.parser")
+    tweets = [job_element.text for job_element in soup.find_all("p")[:NB_TWEETS]]
+    return tweets[1:]  # Supprimer le premier élément qui cause un bug
+
+def count_sentiments(tweets):
+    """Nombre de tweets par sentiment, classés par lots de COMPREHEND_BATCH_SIZE (un appel Comprehend par lot).
+
+    Les tweets rejetés par Comprehend (trop longs, encodage non pris en charge...) sont
+    journalisés et exclus des comptes.
+    """
+    counts = dict.fromkeys(SENTIMENTS, 0)
+    for start in range(0, len(tweets), COMPREHEND_BATCH_SIZE):
+        response = comprehend.batch_detect_sentiment(TextList=tweets[start:start + COMPREHEND_BATCH_SIZE], LanguageCode='en')
+        for result in response['ResultList']:
+            counts[result['Sentiment']] += 1
+        for error in response.get('ErrorList', []):
+            logger.warning(f"Tweet {start + error['Index']} non classé par Comprehend : {error['ErrorCode']} {error.get('ErrorMessage', '')}")
+    return counts
 
 def multi_colormap_semi(database, selected_company, other_companies):
     results = []
     all_companies = [selected_company] + other_companies
 
-    for nom in all_companies:
-        with st.spinner(f"Analyse des tendances utilisateurs en temps réel pour pour {nom}..."):
-            URL = f"https://twstalker.com/search/{nom}"
-            page = requests.get(URL)
-            soup = BeautifulSoup(page.content, "html.parser")
-            tweets = []
-            job_elements = soup.find_all("p")
-            nb_tweets = 30
-
-            for i, job_element in enumerate(job_elements[:nb_tweets]):
-                element = job_element.text
-                tweets.append(element)
-
-            tweets = tweets[1:]  # Supprimer le premier élément qui cause un bug
-
-            positive_tweets = 0
-            negative_tweets = 0
-            neutral_tweets = 0
-            mixed_tweets = 0
-
-            for tweet in tweets:
-                sentiment = classify_sentiment_comprehend(tweet)
-                if sentiment == 'POSITIVE':
-                    positive_tweets += 1
-                elif sentiment == 'NEGATIVE':
-                    negative_tweets += 1
-                elif sentiment == 'NEUTRAL':
-                    neutral_tweets += 1
-                elif sentiment == 'MIXED':
-                    mixed_tweets += 1
-
-            total_tweets = len(tweets)
-            if total_tweets > 0:
-                positive_ratio = positive_tweets / total_tweets
-                cursor_position = (positive_ratio + ((neutral_tweets + mixed_tweets) / total_tweets) / 2) * 100
-            else:
-                cursor_position = 0
+    with st.spinner(f"Analyse des tendances utilisateurs en temps réel pour {len(all_companies)} entreprise(s)..."):
+        # Toutes les entreprises sont téléchargées puis classées en parallèle
+        pages = scraping.fetch_many(f"https://twstalker.com/search/{nom}" for nom in all_companies)
+        tweet_lists = [parse_tweets(page) for page in pages]
+        all_counts = scraping.run_many(count_sentiments, tweet_lists)
+
+    for nom, counts in zip(all_companies, all_counts):
+        total_tweets = sum(counts.values())
+        if total_tweets > 0:
+            positive_ratio = counts['POSITIVE'] / total_tweets
+            cursor_position = (positive_ratio + ((counts['NEUTRAL'] + counts['MIXED']) / total_tweets) / 2) * 100
+        else:
+            cursor_position = 0
 
-            results.append((nom, cursor_position))
+        results.append((nom, cursor_position))
 
     # Trier les résultats par ordre décroissant de la valeur
     results.sort(key=lambda x: x[1], reverse=True)
@@ -0,0 +1,118 @@
+"""Simulation Monte Carlo de la valeur d'un portefeuille acheté puis conservé.
+
+Les rendements quotidiens des actifs suivent des mouvements browniens géométriques
+corrélés (moyenne et covariance annualisées du modèle de risque). Les trajectoires
+sont simulées par blocs indépendants, chacun avec sa propre graine issue d'une
+`SeedSequence` : le résultat ne dépend que de la graine, pas du nombre de processus
+du pool partagé (`compute_pool`) sur lesquels les blocs sont répartis.
+
+Pour un mouvement brownien géométrique, l'incrément de log-prix sur d jours suit
+exactement une loi normale de moyenne d * dérive et de covariance d * covariance
+quotidienne : simuler par pas de `step_days` jours donne la même distribution de la
+valeur aux dates de contrôle qu'une simulation jour par jour, pour step_days fois moins
+de tirages. Un pas de 1 garde les trajectoires quotidiennes.
+"""
+import numpy as np
+
+import compute_pool
+
+TRADING_DAYS = 252
+NUM_PATHS = 100_000
+CHUNK_PATHS = 10_000
+# Jours auxquels la distribution de la valeur est conservée (graphique en éventail)
+CHECKPOINT_EVERY = 21
+PERCENTILES = (5, 25, 50, 75, 95)
+CONFIDENCE = 0.95
+
+
+def _factor(cov):
+    """Facteur L tel que L @ L.T = cov (Cholesky, ou décomposition propre si la matrice est singulière)."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0.0, None))
+
+
+def _simulate_chunk(seed, num_paths, allocation, drift, factor, grid, checkpoints):
+    """Valeurs du portefeuille aux jours `checkpoints` (inclus dans `grid`) pour `num_paths` trajectoires."""
+    rng = np.random.default_rng(seed)
+    log_prices = np.zeros((num_paths, len(allocation)))
+    values = np.empty((num_paths, len(checkpoints)))
+    position = 0
+    previous = 0
+    for day in grid:
+        days = day - previous
+        log_prices += days * drift + np.sqrt(days) * (rng.standard_normal((num_paths, len(allocation))) @ factor.T)
+        previous = day
+        if checkpoints[position] == day:
+            values[:, position] = np.exp(log_prices) @ allocation
+            position += 1
+    return values
+
+
+class SimulationResult:
+    """Distribution de la valeur du portefeuille ; `values` a une colonne par jour de `checkpoints`."""
+
+    def __init__(self, budget, checkpoints, values):
+        self.budget = budget
+        self.checkpoints = checkpoints
+        self.values = values
+
+    @property
+    def final_values(self):
+        return self.values[:, -1]
+
+    def percentiles(self, percentiles=PERCENTILES):
+        """{percentile: valeur finale}."""
+        return dict(zip(percentiles, np.percentile(self.final_values, percentiles)))
+
+    def fan(self, percentiles=PERCENTILES):
+        """Percentiles de la valeur à chaque jour de contrôle (lignes : percentiles, colonnes : jours)."""
+        return np.percentile(self.values, percentiles, axis=0)
+
+    @property
+    def probability_of_loss(self):
+        return float((self.final_values < self.budget).mean())
+
+    def value_at_risk(self, confidence=CONFIDENCE):
+        """Perte (en CAD) dépassée avec une probabilité 1 - confidence."""
+        return float(self.budget - np.quantile(self.final_values, 1 - confidence))
+
+    def conditional_value_at_risk(self, confidence=CONFIDENCE):
+        """Perte moyenne (en CAD) dans les pires 1 - confidence des cas."""
+        threshold = np.quantile(self.final_values, 1 - confidence)
+        return float(self.budget - self.final_values[self.final_values <= threshold].mean())
+
+
+def simulate(weights, mean, cov, budget, num_paths=NUM_PATHS, horizon=TRADING_DAYS, step_days=1, seed=None,
+             parallel=True, chunk_paths=CHUNK_PATHS):
+    """Simule la valeur après `horizon` jours d'un portefeuille de poids `weights` investi à `budget`.
+
+    Si les poids somment à moins de 1 (actions entières), le reste du budget est conservé
+    en liquidités. Les blocs de `chunk_paths` trajectoires sont répartis sur le pool de calcul partagé
+    (`parallel=False` : tout dans le processus courant).
+    """
+    weights = np.asarray(weights, dtype=float)
+    mean = np.asarray(mean, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    daily_cov = cov / TRADING_DAYS
+    # Dérive des log-prix : rendement espéré moins la correction d'Itô
+    drift = (mean - 0.5 * np.diag(cov)) / TRADING_DAYS
+    factor = _factor(daily_cov)
+    checkpoints = np.unique(np.append(np.arange(CHECKPOINT_EVERY, horizon, CHECKPOINT_EVERY), horizon))
+    grid = np.union1d(np.arange(step_days, horizon, step_days), checkpoints)
+    allocation = budget * weights
+
+    sizes = [min(chunk_paths, num_paths - start) for start in range(0, num_paths, chunk_paths)]
+    seeds = compute_pool.spawn_seeds(seed, len(sizes))
+    args = [(s, n, allocation, drift, factor, grid, checkpoints) for s, n in zip(seeds, sizes)]
+
+    if parallel and len(sizes) > 1:
+        parts = compute_pool.run_many(_simulate_chunk, *zip(*args))
+    else:
+        parts = [_simulate_chunk(*a) for a in args]
+    values = np.vstack(parts) + budget * (1.0 - weights.sum())
+    # Valeur initiale en première colonne, pour le graphique
+    values = np.hstack([np.full((num_paths, 1), float(budget)), values])
+    return SimulationResult(budget, np.concatenate([[0], checkpoints]), values)